@@ -1,9 +1,24 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import uuid
 from typing import Dict, List, Optional
-import json
+import io
+import os
+
+import bulk_io
+import capacity
+import instrumentation
+import persistence
+import priority
+from audit import AuditLog
+from board_cache import BoardCache
+from board_snapshot import BoardSnapshot
+from bulk_ops import BulkQueue
+from card_render import CARD_CSS
+from priority_refresh import PriorityRefresher
+from search_index import FACETS, SearchResult
+from task_store import MIN_HOURS, EditConflict, TaskRecord, whole_hours
+import vocabulary
 
 # Last updated: December 19, 2024 at 3:45 PM
 
@@ -15,77 +30,59 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize session state for data persistence
-if 'accounts' not in st.session_state:
-    st.session_state.accounts = [
-        {
-            'id': 'VID4A',
-            'name': 'VID4A',
-            'stage': 'Customer',
-            'phase': 'Journey',
-            'tech_stack': ['Python', 'Streamlit']
-        },
-        {
-            'id': 'REDIS',
-            'name': 'REDIS',
-            'stage': 'Prospect',
-            'phase': 'Discovery',
-            'tech_stack': ['Redis', 'Docker']
-        },
-        {
-            'id': 'FINONEX',
-            'name': 'FINONEX',
-            'stage': 'Lead',
-            'phase': 'Qualification',
-            'tech_stack': ['React', 'Node.js']
-        }
-    ]
+# Timing spans and counters for this rerun; no-ops unless ATM_INSTRUMENT is set
+if 'session_tag' not in st.session_state:
+    st.session_state.session_tag = uuid.uuid4().hex[:8]
+instrumentation.begin_rerun(st.session_state.session_tag)
+
+@st.cache_resource
+def get_backend() -> persistence.Backend:
+    """Process-wide persistence backend shared by every session"""
+    return persistence.create_backend()
+
+@st.cache_resource
+def get_options() -> Dict[str, List[str]]:
+    """Stage, phase and tech stack options from the LKP_* tables, read once per process"""
+    options = get_backend().load_options()
+    vocabulary.use_options(options)
+    return options
+
+@st.cache_resource
+def get_board_cache() -> BoardCache:
+    """Board cache shared by every session, in front of the persistence backend"""
+    backend = get_backend()
+    audit = AuditLog(backend, os.environ.get('ATM_AUDIT_SPOOL', 'audit_spool.jsonl'))
+    # Columnar copy of a database-backed board, so a restart reads a delta instead of the full tables
+    snapshot_dir = os.environ.get('ATM_SNAPSHOT_DIR', 'board_snapshot')
+    snapshot = BoardSnapshot(snapshot_dir, backend.source) if backend.source and snapshot_dir else None
+    return BoardCache(backend, audit=audit, snapshot_store=snapshot)
+
+@st.cache_resource
+def get_priority_refresher() -> Optional[PriorityRefresher]:
+    """Nightly PRIORITY_SCORE refresh; Snowflake runs it from TSK_UPDATE_TASK_PRIORITIES instead"""
+    backend = get_backend()
+    if isinstance(backend, persistence.SnowflakeBackend):
+        return None
+    return PriorityRefresher(backend).start()
 
-if 'tasks' not in st.session_state:
-    st.session_state.tasks = [
-        {
-            'id': str(uuid.uuid4()),
-            'account_id': 'VID4A',
-            'title': 'Customer check-in task',
-            'description': 'Need to check-in with customer, not scheduled',
-            'priority_level': 'check-in',
-            'estimated_hours': 2,
-            'deadline': datetime.now() + timedelta(days=7),
-            'status': 'pending',
-            'created_at': datetime.now()
-        },
-        {
-            'id': str(uuid.uuid4()),
-            'account_id': 'REDIS',
-            'title': 'Project implementation',
-            'description': 'Project in 2 months, scheduled',
-            'priority_level': 'task with deadline',
-            'estimated_hours': 80,
-            'deadline': datetime.now() + timedelta(days=60),
-            'status': 'in_progress',
-            'created_at': datetime.now()
-        },
-        {
-            'id': str(uuid.uuid4()),
-            'account_id': 'VID4A',
-            'title': 'Documentation update',
-            'description': 'Update project documentation',
-            'estimated_hours': 5,
-            'deadline': datetime.now() + timedelta(days=5),
-            'status': 'pending',
-            'created_at': datetime.now()
-        },
-        {
-            'id': str(uuid.uuid4()),
-            'account_id': 'FINONEX',
-            'title': 'Initial setup',
-            'description': 'Set up development environment',
-            'estimated_hours': 12,
-            'deadline': datetime.now() + timedelta(days=2),
-            'status': 'pending',
-            'created_at': datetime.now()
-        }
-    ]
+@st.cache_resource
+def get_bulk_queue() -> BulkQueue:
+    """Background workers applying bulk task actions to the shared board"""
+    return BulkQueue(get_board_cache())
+
+# Re-fetch the shared board only when a write (or TTL expiry) has bumped its version
+get_options()
+board = get_board_cache()
+get_priority_refresher()
+with instrumentation.span('board.refresh'):
+    if st.session_state.get('board_version') != board.poll():
+        st.session_state.board_version, snapshot = board.snapshot()
+        st.session_state.accounts = snapshot.accounts
+        st.session_state.tasks = snapshot.tasks
+        st.session_state.priorities = snapshot.priorities
+        st.session_state.stats = snapshot.stats
+        st.session_state.capacity_plan = snapshot.capacity
+        st.session_state.cards = snapshot.cards
 
 # Initialize modal states
 if 'show_task_modal' not in st.session_state:
@@ -96,219 +93,279 @@ if 'show_account_modal' not in st.session_state:
     st.session_state.show_account_modal = False
 if 'edit_account_id' not in st.session_state:
     st.session_state.edit_account_id = None
+# Record each modal was opened on (the base of a compare-and-swap save) and the last save conflict
+if 'edit_task_base' not in st.session_state:
+    st.session_state.edit_task_base = None
+if 'edit_account_base' not in st.session_state:
+    st.session_state.edit_account_base = None
+if 'edit_conflict' not in st.session_state:
+    st.session_state.edit_conflict = None
+# Tasks picked for a bulk action (the epoch is part of the checkbox keys, so bumping it redraws them all)
+# and the bulk jobs this session is waiting on
+if 'bulk_selection' not in st.session_state:
+    st.session_state.bulk_selection = set()
+if 'bulk_epoch' not in st.session_state:
+    st.session_state.bulk_epoch = 0
+if 'bulk_jobs' not in st.session_state:
+    st.session_state.bulk_jobs = []
 
-def calculate_priority_score(task: Dict) -> int:
-    """Calculate priority score based on deadline proximity and effort"""
-    days_until_deadline = (task['deadline'] - datetime.now()).days
-    effort_hours = task['estimated_hours']
-    
-    # Higher score = higher priority
-    if days_until_deadline <= 0:
-        return 1000 + effort_hours  # Overdue - highest priority
-    elif days_until_deadline <= 3:
-        return 900 - effort_hours  # Urgent
-    elif days_until_deadline <= 7:
-        return 800 - effort_hours  # High priority
-    elif days_until_deadline <= 30:
-        return 600 - effort_hours  # Medium priority
-    else:
-        return 400 - effort_hours  # Low priority
+# Task grid paging (page index and cards per page)
+TASK_PAGE_SIZES = [10, 25, 50, 100]
+if 'task_page' not in st.session_state:
+    st.session_state.task_page = 0
+if 'task_page_size' not in st.session_state:
+    st.session_state.task_page_size = 25
+# Search query and facet filters, as (query, ((facet, values), ...))
+if 'task_filter' not in st.session_state:
+    st.session_state.task_filter = ('', ())
 
-def get_priority_label(score: int) -> str:
-    """Convert priority score to human readable label"""
-    if score >= 900:
-        return "🔴"
-    elif score >= 800:
-        return "🟠"
-    elif score >= 600:
-        return "🟡"
-    elif score >= 400:
-        return "🔵"
-    else:
-        return "⚪"
+@instrumentation.timed('search')
+def search_tasks(offset: int, limit: int) -> SearchResult:
+    """One page of the searched / filtered task board with its facet counts, from the shared search index"""
+    query, filters = st.session_state.task_filter
+    return board.search(query, dict(filters), offset, limit)
 
-def get_priority_color(score: int) -> str:
-    """Get background color for priority"""
-    if score >= 900:
-        return "#ffebee"  # Light red
-    elif score >= 800:
-        return "#fff3e0"  # Light orange
-    elif score >= 600:
-        return "#fffde7"  # Light yellow
-    elif score >= 400:
-        return "#e3f2fd"  # Light blue
+def get_task_priority(task_id: str) -> priority.Priority:
+    """Precomputed score, label, icon and color of a task, read from the board's priority index"""
+    return st.session_state.priorities.priority(task_id)
+
+def conflict_message(conflict: EditConflict, kind: str) -> str:
+    """Explain a failed save in the edit modal"""
+    if conflict.current is None or not conflict.fields:
+        return (f"This {kind} was changed elsewhere while you were editing. "
+                f"Save again to apply your changes on top of the latest version.")
+    changes = []
+    for field in conflict.fields:
+        value = getattr(conflict.current, field)
+        if isinstance(value, datetime):
+            value = value.date()
+        elif isinstance(value, tuple):
+            value = ', '.join(value)
+        changes.append(f"{field.replace('_', ' ')} is now '{value}'")
+    return (f"Someone else saved this {kind} while you were editing: {'; '.join(changes)}. "
+            f"Save again to overwrite with your values, or Cancel.")
+
+def toggle_task_selection(task_id: str, key: str):
+    """Checkbox callback keeping the bulk selection in step with the task cards"""
+    if st.session_state[key]:
+        st.session_state.bulk_selection.add(task_id)
     else:
-        return "#f5f5f5"  # Light gray
+        st.session_state.bulk_selection.discard(task_id)
 
-def render_task_card(task: Dict, account_name: str):
-    """Render a single task as a card"""
-    priority_score = calculate_priority_score(task)
-    priority_icon = get_priority_label(priority_score)
-    priority_color = get_priority_color(priority_score)
-    
-    days_left = (task['deadline'] - datetime.now()).days
-    
-    # Task card styling
-    card_style = f"""
-    <div style="
-        background-color: {priority_color};
-        border: 1px solid #ddd;
-        border-radius: 8px;
-        padding: 12px;
-        margin: 8px;
-        height: 140px;
-        cursor: pointer;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        transition: transform 0.2s;
-    ">
-        <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 8px;">
-            <span style="font-size: 18px;">{priority_icon}</span>
-            <span style="font-size: 12px; color: #666;">{days_left}d</span>
-        </div>
-        <div style="font-weight: bold; font-size: 14px; margin-bottom: 4px; line-height: 1.2;">
-            {task['title'][:30]}{'...' if len(task['title']) > 30 else ''}
-        </div>
-        <div style="font-size: 12px; color: #666; margin-bottom: 8px;">
-            {account_name}
-        </div>
-        <div style="font-size: 11px; color: #888; margin-bottom: 4px;">
-            {task['estimated_hours']}h • {task['status'].replace('_', ' ').title()}
-        </div>
-        <div style="font-size: 10px; color: #aaa;">
-            {task['description'][:40]}{'...' if len(task['description']) > 40 else ''}
-        </div>
-    </div>
-    """
-    
-    return card_style
+def set_bulk_selection(task_ids):
+    """Replace the bulk selection; the new epoch re-keys the card checkboxes so they show it"""
+    st.session_state.bulk_selection = set(task_ids)
+    st.session_state.bulk_epoch += 1
+
+@instrumentation.timed('card_html')
+def render_task_card(task: TaskRecord, account_name: str, task_priority: priority.Priority):
+    """Render a single task as a card (memoized per task version, bucket and days left)"""
+    return st.session_state.cards.render(task, account_name, task_priority)
 
 @st.dialog("Edit Task")
+@instrumentation.timed('task_modal')
 def task_edit_modal():
     """Modal for editing tasks"""
     if st.session_state.edit_task_id:
-        task = next((t for t in st.session_state.tasks if t['id'] == st.session_state.edit_task_id), None)
+        # Form defaults come from the record the modal was opened on, so they stay put while others save
+        task = st.session_state.tasks.get(st.session_state.edit_task_id) and st.session_state.edit_task_base
         if task:
+            if st.session_state.edit_conflict:
+                st.warning(st.session_state.edit_conflict)
             with st.form("edit_task_modal_form"):
                 col1, col2 = st.columns(2)
                 with col1:
-                    new_title = st.text_input("Title", value=task['title'])
+                    new_title = st.text_input("Title", value=task.title)
                     new_account = st.selectbox("Account", 
-                                             options=[acc['id'] for acc in st.session_state.accounts],
-                                             index=[acc['id'] for acc in st.session_state.accounts].index(task['account_id']))
+                                             options=st.session_state.accounts.ids(),
+                                             index=st.session_state.accounts.position(task.account_id))
                     new_status = st.selectbox("Status", 
-                                            ["pending", "in_progress", "completed", "on_hold"],
-                                            index=["pending", "in_progress", "completed", "on_hold"].index(task['status']))
+                                            vocabulary.STATUSES,
+                                            index=vocabulary.STATUS_INDEX.get(task.status, 0))
                 with col2:
-                    new_hours = st.number_input("Estimated Hours", value=task['estimated_hours'], min_value=1)
-                    new_deadline = st.date_input("Deadline", value=task['deadline'].date())
+                    # Float-typed like the stored value; older rows may sit below the form's minimum
+                    new_hours = st.number_input("Estimated Hours", value=float(task.estimated_hours), step=0.5,
+                                                min_value=min(MIN_HOURS, float(task.estimated_hours)))
+                    new_deadline = st.date_input("Deadline", value=task.deadline.date())
                 
-                new_description = st.text_area("Description", value=task['description'])
+                new_description = st.text_area("Description", value=task.description)
                 
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     if st.form_submit_button("Update Task", use_container_width=True):
-                        task_index = next(i for i, t in enumerate(st.session_state.tasks) if t['id'] == task['id'])
-                        st.session_state.tasks[task_index].update({
-                            'title': new_title,
-                            'account_id': new_account,
-                            'description': new_description,
-                            'estimated_hours': new_hours,
-                            'deadline': datetime.combine(new_deadline, datetime.min.time()),
-                            'status': new_status
-                        })
-                        st.session_state.show_task_modal = False
-                        st.session_state.edit_task_id = None
-                        st.success("Task updated!")
+                        try:
+                            board.update_task({
+                                'id': task.id,
+                                'title': new_title,
+                                'account_id': new_account,
+                                'description': new_description,
+                                'estimated_hours': whole_hours(new_hours),
+                                'deadline': datetime.combine(new_deadline, datetime.min.time()),
+                                'status': new_status
+                            }, base=task, force=bool(st.session_state.edit_conflict))
+                        except EditConflict as e:
+                            st.session_state.edit_conflict = conflict_message(e, "task")
+                        else:
+                            st.session_state.show_task_modal = False
+                            st.session_state.edit_task_id = None
+                            st.session_state.edit_conflict = None
+                            st.success("Task updated!")
                         st.rerun()
                 with col2:
                     if st.form_submit_button("Delete Task", use_container_width=True):
-                        st.session_state.tasks = [t for t in st.session_state.tasks if t['id'] != task['id']]
+                        board.delete_task(task.id)
                         st.session_state.show_task_modal = False
                         st.session_state.edit_task_id = None
+                        st.session_state.edit_conflict = None
                         st.success("Task deleted!")
                         st.rerun()
                 with col3:
                     if st.form_submit_button("Cancel", use_container_width=True):
                         st.session_state.show_task_modal = False
                         st.session_state.edit_task_id = None
+                        st.session_state.edit_conflict = None
                         st.rerun()
+        else:
+            # Deleted in another session while the modal was open; close it for good on the next rerun
+            st.session_state.show_task_modal = False
+            st.session_state.edit_task_id = None
+            st.session_state.edit_conflict = None
+            st.warning("This task was deleted by someone else.")
+            if st.button("Close", use_container_width=True):
+                st.rerun()
 
 @st.dialog("Edit Account")
+@instrumentation.timed('account_modal')
 def account_edit_modal():
     """Modal for editing accounts"""
     if st.session_state.edit_account_id:
-        account = next((acc for acc in st.session_state.accounts if acc['id'] == st.session_state.edit_account_id), None)
+        account = st.session_state.accounts.get(st.session_state.edit_account_id) and st.session_state.edit_account_base
         if account:
+            if st.session_state.edit_conflict:
+                st.warning(st.session_state.edit_conflict)
             with st.form("edit_account_modal_form"):
                 col1, col2 = st.columns(2)
                 with col1:
-                    new_name = st.text_input("Account Name", value=account['name'])
-                    new_stage = st.selectbox("Stage", ["Lead", "Prospect", "Customer", "Partner"], 
-                                           index=["Lead", "Prospect", "Customer", "Partner"].index(account['stage']))
+                    new_name = st.text_input("Account Name", value=account.name)
+                    new_stage = st.selectbox("Stage", vocabulary.STAGES,
+                                           index=vocabulary.STAGE_INDEX.get(account.stage, 0))
                 with col2:
-                    new_phase = st.selectbox("Phase", ["Discovery", "Qualification", "Journey", "Implementation", "Support"],
-                                           index=["Discovery", "Qualification", "Journey", "Implementation", "Support"].index(account['phase']))
+                    new_phase = st.selectbox("Phase", vocabulary.PHASES,
+                                           index=vocabulary.PHASE_INDEX.get(account.phase, 0))
                 
-                new_tech_stack = st.multiselect("Tech Stack", 
-                    ["Python", "Streamlit", "React", "Node.js", "Redis", "Docker", "PostgreSQL", "MongoDB", "AWS", "Azure"],
-                    default=account['tech_stack'])
+                # Keep techs stored outside the standard list (e.g. other LKP_TECH_STACK codes) selectable
+                new_tech_stack = st.multiselect("Tech Stack",
+                    vocabulary.TECH_STACK + [t for t in account.tech_stack if t not in vocabulary.TECH_STACK],
+                    default=list(account.tech_stack))
                 
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.form_submit_button("Update Account", use_container_width=True):
-                        account_index = next(i for i, acc in enumerate(st.session_state.accounts) if acc['id'] == account['id'])
-                        st.session_state.accounts[account_index].update({
-                            'name': new_name,
-                            'stage': new_stage,
-                            'phase': new_phase,
-                            'tech_stack': new_tech_stack
-                        })
-                        st.session_state.show_account_modal = False
-                        st.session_state.edit_account_id = None
-                        st.success("Account updated!")
+                        try:
+                            board.update_account({
+                                'id': account.id,
+                                'name': new_name,
+                                'stage': new_stage,
+                                'phase': new_phase,
+                                'tech_stack': new_tech_stack
+                            }, base=account, force=bool(st.session_state.edit_conflict))
+                        except EditConflict as e:
+                            st.session_state.edit_conflict = conflict_message(e, "account")
+                        else:
+                            st.session_state.show_account_modal = False
+                            st.session_state.edit_account_id = None
+                            st.session_state.edit_conflict = None
+                            st.success("Account updated!")
                         st.rerun()
                 with col2:
                     if st.form_submit_button("Cancel", use_container_width=True):
                         st.session_state.show_account_modal = False
                         st.session_state.edit_account_id = None
+                        st.session_state.edit_conflict = None
                         st.rerun()
+        else:
+            # Deleted in another session while the modal was open; close it for good on the next rerun
+            st.session_state.show_account_modal = False
+            st.session_state.edit_account_id = None
+            st.session_state.edit_conflict = None
+            st.warning("This account was deleted by someone else.")
+            if st.button("Close", use_container_width=True):
+                st.rerun()
+
+def reset_task_page():
+    """Go back to the first page of the task grid"""
+    st.session_state.task_page = 0
 
+@instrumentation.timed('tasks_section')
 def render_tasks_section():
     """Render the tasks management section with card layout"""
     st.header("📋 TASKS")
+    st.markdown(CARD_CSS, unsafe_allow_html=True)
     
-    # Sort tasks by priority
-    sorted_tasks = sorted(st.session_state.tasks, 
-                         key=lambda x: calculate_priority_score(x), 
-                         reverse=True)
+    # Fetch only the visible page; search, filtering and ranking are resolved by the shared board indexes
+    priorities = st.session_state.priorities
+    page_size = st.session_state.task_page_size
+    page_ids, total, _ = search_tasks(st.session_state.task_page * page_size, page_size)
+    page_count = max(1, -(-total // page_size))
+    if st.session_state.task_page >= page_count:
+        # The filtered board shrank below the current page
+        st.session_state.task_page = page_count - 1
+        page_ids, total, _ = search_tasks(st.session_state.task_page * page_size, page_size)
+    sorted_ids = [task_id for task_id in page_ids if task_id in st.session_state.tasks and task_id in priorities]
+    
+    render_bulk_actions(total)
     
     # Display tasks in a grid layout (5 per row)
-    if sorted_tasks:
-        rows = [sorted_tasks[i:i+5] for i in range(0, len(sorted_tasks), 5)]
+    if sorted_ids:
+        rows = [sorted_ids[i:i+5] for i in range(0, len(sorted_ids), 5)]
         
         for row in rows:
             cols = st.columns(5)
-            for i, task in enumerate(row):
+            for i, task_id in enumerate(row):
+                task = st.session_state.tasks.get(task_id)
                 with cols[i]:
                     # Find associated account
-                    account = next((acc for acc in st.session_state.accounts if acc['id'] == task['account_id']), None)
-                    account_name = account['name'] if account else 'Unknown'
+                    account = st.session_state.accounts.get(task.account_id)
+                    account_name = account.name if account else 'Unknown'
                     
                     # Render task card
-                    card_html = render_task_card(task, account_name)
+                    card_html = render_task_card(task, account_name, get_task_priority(task_id))
                     st.markdown(card_html, unsafe_allow_html=True)
                     
                     # Edit button for each task
-                    if st.button("✏️ Edit", key=f"edit_task_{task['id']}", use_container_width=True):
-                        st.session_state.edit_task_id = task['id']
+                    if st.button("✏️ Edit", key=f"edit_task_{task.id}", use_container_width=True):
+                        st.session_state.edit_task_id = task.id
+                        st.session_state.edit_task_base = task
+                        st.session_state.edit_conflict = None
                         st.session_state.show_task_modal = True
                         st.rerun()
+                    select_key = f"select_task_{task.id}_{st.session_state.bulk_epoch}"
+                    st.checkbox("Select", key=select_key, value=task.id in st.session_state.bulk_selection,
+                                on_change=toggle_task_selection, args=(task.id, select_key))
             
             # Fill empty columns if needed
             for i in range(len(row), 5):
                 with cols[i]:
                     st.empty()
     
+    # Pager
+    col1, col2, col3, col4 = st.columns([1, 2, 1, 1])
+    with col1:
+        if st.button("◀ Prev", key="task_page_prev", disabled=st.session_state.task_page == 0, use_container_width=True):
+            st.session_state.task_page -= 1
+            st.rerun()
+    with col2:
+        first = st.session_state.task_page * page_size + 1 if total else 0
+        last = min(total, (st.session_state.task_page + 1) * page_size)
+        st.caption(f"Page {st.session_state.task_page + 1} of {page_count} • tasks {first}–{last} of {total}")
+    with col3:
+        if st.button("Next ▶", key="task_page_next", disabled=st.session_state.task_page + 1 >= page_count, use_container_width=True):
+            st.session_state.task_page += 1
+            st.rerun()
+    with col4:
+        st.selectbox("Per page", TASK_PAGE_SIZES, key="task_page_size", label_visibility="collapsed",
+                     on_change=reset_task_page)
+    
     # Add new task button
     if st.button("➕ ADD TASK", key="add_task_btn", use_container_width=True):
         st.session_state.show_add_task = True
@@ -320,11 +377,11 @@ def render_tasks_section():
             col1, col2 = st.columns(2)
             with col1:
                 task_title = st.text_input("Task Title")
-                task_account = st.selectbox("Account", options=[acc['id'] for acc in st.session_state.accounts])
-                task_hours = st.number_input("Estimated Hours", value=1, min_value=1)
+                task_account = st.selectbox("Account", options=st.session_state.accounts.ids())
+                task_hours = st.number_input("Estimated Hours", value=1.0, min_value=MIN_HOURS, step=0.5)
             with col2:
                 task_deadline = st.date_input("Deadline", value=datetime.now().date() + timedelta(days=7))
-                task_status = st.selectbox("Status", ["pending", "in_progress", "completed", "on_hold"])
+                task_status = st.selectbox("Status", vocabulary.STATUSES)
             
             task_description = st.text_area("Description")
             
@@ -337,12 +394,12 @@ def render_tasks_section():
                             'account_id': task_account,
                             'title': task_title,
                             'description': task_description,
-                            'estimated_hours': task_hours,
+                            'estimated_hours': whole_hours(task_hours),
                             'deadline': datetime.combine(task_deadline, datetime.min.time()),
                             'status': task_status,
                             'created_at': datetime.now()
                         }
-                        st.session_state.tasks.append(new_task)
+                        board.add_task(new_task)
                         st.session_state.show_add_task = False
                         st.success("Task added!")
                         st.rerun()
@@ -351,6 +408,77 @@ def render_tasks_section():
                     st.session_state.show_add_task = False
                     st.rerun()
 
+@instrumentation.timed('bulk_actions')
+def render_bulk_actions(total: int):
+    """Selection bar and bulk reassign / re-date / status actions, applied by the background bulk queue"""
+    selection = st.session_state.bulk_selection
+    
+    # Outcome of jobs that finished since the last full rerun
+    for job in st.session_state.pop('bulk_done', []):
+        if job.error is not None:
+            st.error(f"{job.label} failed after {job.updated} of {job.total} tasks: {job.error}")
+        elif job.skipped:
+            st.warning(f"{job.label}: updated {job.updated} tasks, skipped {len(job.skipped)} that were "
+                       f"deleted or kept changing elsewhere")
+        else:
+            st.success(f"{job.label}: updated {job.updated} tasks")
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        st.caption(f"{len(selection)} task(s) selected for bulk actions")
+    with col2:
+        if st.button(f"☑️ Select all {total} matching", key="bulk_select_all_btn", disabled=not total,
+                     use_container_width=True):
+            set_bulk_selection(search_tasks(0, total).ids)
+            st.rerun()
+    with col3:
+        if st.button("✖️ Clear selection", key="bulk_clear_btn", disabled=not selection, use_container_width=True):
+            set_bulk_selection(())
+            st.rerun()
+    
+    if selection:
+        col1, col2, col3 = st.columns([1, 2, 1], vertical_alignment="bottom")
+        with col1:
+            action = st.selectbox("Bulk action", ["Change status", "Reassign", "Re-date"], key="bulk_action")
+        with col2:
+            if action == "Change status":
+                value = st.selectbox("New status", vocabulary.STATUSES, key="bulk_status")
+                changes, label = {'status': value}, f"Status → {value}"
+            elif action == "Reassign":
+                accounts = st.session_state.accounts
+                value = st.selectbox("New account", options=accounts.ids(), key="bulk_account",
+                                     format_func=lambda account_id: accounts.get(account_id).name)
+                changes, label = {'account_id': value}, f"Reassign → {accounts.get(value).name}"
+            else:
+                value = st.date_input("New deadline", value=date.today() + timedelta(days=7), key="bulk_deadline")
+                changes, label = {'deadline': datetime.combine(value, datetime.min.time())}, f"Deadline → {value}"
+        with col3:
+            if st.button(f"Apply to {len(selection)} tasks", key="bulk_apply_btn", type="primary",
+                         use_container_width=True):
+                job = get_bulk_queue().submit(sorted(selection), changes, label, st.session_state.session_tag)
+                st.session_state.bulk_jobs.append(job.id)
+                set_bulk_selection(())
+                st.rerun()
+    
+    if st.session_state.bulk_jobs:
+        bulk_progress()
+
+@st.fragment(run_every=1.0)
+def bulk_progress():
+    """Progress of this session's bulk jobs, polled every second without rerunning the whole page"""
+    queue = get_bulk_queue()
+    jobs = [job for job in map(queue.get, st.session_state.bulk_jobs) if job is not None]
+    finished = [job for job in jobs if job.finished]
+    for job in jobs:
+        if not job.finished:
+            st.progress(job.progress, text=f"{job.label}: {job.processed} of {job.total} tasks")
+    if finished or len(jobs) < len(st.session_state.bulk_jobs):
+        # Redraw the page once so it shows the updated board and the outcome
+        st.session_state.bulk_jobs = [job.id for job in jobs if not job.finished]
+        st.session_state.bulk_done = st.session_state.get('bulk_done', []) + finished
+        st.rerun(scope="app")
+
+@instrumentation.timed('accounts_section')
 def render_accounts_section():
     """Render the accounts management section"""
     st.header("📊 ACCOUNTS")
@@ -360,16 +488,18 @@ def render_accounts_section():
         with st.container():
             col1, col2, col3, col4, col5 = st.columns([2, 1.5, 1.5, 2, 1])
             with col1:
-                st.write(f"**{account['name']}**")
+                st.write(f"**{account.name}**")
             with col2:
-                st.write(f"{account['stage']}")
+                st.write(f"{account.stage}")
             with col3:
-                st.write(f"{account['phase']}")
+                st.write(f"{account.phase}")
             with col4:
-                st.write(f"{', '.join(account['tech_stack'])}")
+                st.write(f"{', '.join(account.tech_stack)}")
             with col5:
-                if st.button("✏️", key=f"edit_account_{account['id']}", help="Edit Account"):
-                    st.session_state.edit_account_id = account['id']
+                if st.button("✏️", key=f"edit_account_{account.id}", help="Edit Account"):
+                    st.session_state.edit_account_id = account.id
+                    st.session_state.edit_account_base = account
+                    st.session_state.edit_conflict = None
                     st.session_state.show_account_modal = True
                     st.rerun()
             st.divider()
@@ -385,12 +515,11 @@ def render_accounts_section():
             col1, col2 = st.columns(2)
             with col1:
                 new_name = st.text_input("Account Name")
-                new_stage = st.selectbox("Stage", ["Lead", "Prospect", "Customer", "Partner"])
+                new_stage = st.selectbox("Stage", vocabulary.STAGES)
             with col2:
-                new_phase = st.selectbox("Phase", ["Discovery", "Qualification", "Journey", "Implementation", "Support"])
+                new_phase = st.selectbox("Phase", vocabulary.PHASES)
             
-            new_tech_stack = st.multiselect("Tech Stack", 
-                ["Python", "Streamlit", "React", "Node.js", "Redis", "Docker", "PostgreSQL", "MongoDB", "AWS", "Azure"])
+            new_tech_stack = st.multiselect("Tech Stack", vocabulary.TECH_STACK)
             
             col1, col2 = st.columns(2)
             with col1:
@@ -403,34 +532,165 @@ def render_accounts_section():
                             'phase': new_phase,
                             'tech_stack': new_tech_stack
                         }
-                        st.session_state.accounts.append(new_account)
-                        st.session_state.show_add_account = False
-                        st.rerun()
+                        try:
+                            board.add_account(new_account)
+                        except ValueError as e:
+                            st.error(str(e))
+                        else:
+                            st.session_state.show_add_account = False
+                            st.rerun()
             with col2:
                 if st.form_submit_button("Cancel"):
                     st.session_state.show_add_account = False
                     st.rerun()
 
+@instrumentation.timed('capacity_section')
+def render_capacity_section():
+    """Render the workload forecast: open task hours spread over the working days up to each deadline"""
+    with st.expander("📆 Capacity Planning", key="capacity_section", on_change="rerun") as section:
+        if not section.open:
+            return
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            by = st.radio("Group by", ["Account", "Status"], horizontal=True, key="capacity_by")
+        with col2:
+            period = st.radio("Period", ["Weekly", "Daily"], horizontal=True, key="capacity_period")
+        with col3:
+            daily_capacity = st.number_input("Hours per account per day", min_value=0.5, step=0.5,
+                                             value=capacity.DAILY_CAPACITY, key="capacity_hours")
+        
+        plan = st.session_state.capacity_plan
+        load = plan.weekly(by.lower()) if period == "Weekly" else plan.daily(by.lower())
+        label_format = "Week of %b %d" if period == "Weekly" else "%a %b %d"
+        if by == "Account":
+            accounts = st.session_state.accounts
+            names = [accounts.get(key).name if key in accounts else key for key in load.keys]
+        else:
+            names = load.keys
+        rows = [i for i, hours in enumerate(load.hours) if hours.any()]
+        if not rows:
+            st.info("No open work with estimated hours")
+            return
+        hours = load.hours[rows]
+        table = {by: [names[i] for i in rows], "Total": hours.sum(axis=1).round(1).tolist()}
+        table.update((day.strftime(label_format), hours[:, j].round(1).tolist()) for j, day in enumerate(load.dates))
+        st.caption(f"Open hours from {plan.today:%b %d, %Y} over the next {plan.horizon_days} days, "
+                   f"spread evenly across the working days up to each deadline")
+        st.dataframe(table, hide_index=True)
+        
+        overloads = plan.overloads(daily_capacity)
+        if overloads:
+            accounts = st.session_state.accounts
+            st.warning(f"Over {daily_capacity:g}h per working day: {len({o.account_id for o in overloads})} "
+                       f"account(s) in {len(overloads)} window(s)")
+            st.dataframe([{
+                'account': accounts.get(o.account_id).name if o.account_id in accounts else o.account_id,
+                'from': o.start,
+                'to': o.end,
+                'working days': o.days,
+                'peak hours/day': o.peak_hours,
+                'hours over capacity': o.excess_hours,
+            } for o in overloads[:200]], hide_index=True)
+        else:
+            st.success(f"No account goes over {daily_capacity:g}h per working day")
+
+@instrumentation.timed('bulk_io_section')
+def render_bulk_io_section():
+    """Render bulk CSV/Parquet import and export of tasks and accounts"""
+    with st.expander("📦 Bulk Import / Export"):
+        kind = st.radio("Records", ["Tasks", "Accounts"], horizontal=True, key="bulk_kind")
+        
+        # Outcome of the last import, kept across the rerun that refreshes the board
+        if 'bulk_result' in st.session_state:
+            result = st.session_state.pop('bulk_result')
+            if result.failure:
+                st.error(f"Import stopped after {result.imported} rows: {result.failure}")
+            else:
+                st.success(f"Imported {result.imported} rows")
+            if result.errors:
+                st.warning(f"Skipped {len(result.errors)} invalid rows")
+                st.dataframe([{'row': row, 'error': error} for row, error in result.errors[:100]], hide_index=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            uploaded = st.file_uploader("Import file", type=list(bulk_io.FORMATS), key="bulk_upload")
+            if uploaded is not None and st.button("⬆️ Import", key="bulk_import_btn", use_container_width=True):
+                fmt = uploaded.name.rsplit('.', 1)[-1].lower()
+                importer = bulk_io.import_tasks if kind == "Tasks" else bulk_io.import_accounts
+                progress_bar = st.progress(0.0, text="Importing...")
+                try:
+                    st.session_state.bulk_result = importer(
+                        uploaded, fmt, board,
+                        progress=lambda fraction, count: progress_bar.progress(fraction, text=f"Imported {count} rows"))
+                except ImportError:
+                    st.error("Parquet support needs the pyarrow package")
+                else:
+                    st.rerun()
+        with col2:
+            fmt = st.selectbox("Export format", bulk_io.FORMATS, key="bulk_format")
+            if st.button("⬇️ Prepare export", key="bulk_export_btn", use_container_width=True):
+                out = io.BytesIO()
+                try:
+                    if kind == "Tasks":
+                        # The searched / filtered board, in result order
+                        ranked = search_tasks(0, len(st.session_state.tasks)).ids
+                        tasks = (st.session_state.tasks.get(task_id) for task_id in ranked)
+                        bulk_io.export_tasks((task for task in tasks if task is not None), fmt, out)
+                    else:
+                        bulk_io.export_accounts(st.session_state.accounts, fmt, out)
+                except ImportError:
+                    st.error("Parquet support needs the pyarrow package")
+                else:
+                    st.session_state.bulk_export = (f"{kind.lower()}.{fmt}", out.getvalue())
+            if 'bulk_export' in st.session_state:
+                file_name, data = st.session_state.bulk_export
+                st.download_button(f"💾 Download {file_name}", data=data, file_name=file_name,
+                                   key="bulk_download_btn", use_container_width=True)
+
+def render_metrics_overlay():
+    """Sidebar view of the latest reruns, their spans and counters, with one-off profiling (ATM_INSTRUMENT)"""
+    with st.expander("⏱️ Rerun metrics", key="metrics_overlay", on_change="rerun") as overlay:
+        if not overlay.open:
+            return
+        reruns = instrumentation.recent(10)
+        if reruns:
+            latest = reruns[0]
+            st.caption(f"Last rerun: {latest.duration_ms:.0f} ms")
+            st.text("\n".join(f"{'  ' * span.depth}{span.name:<{24 - 2 * span.depth}} {span.duration_ms:7.1f} ms"
+                               for span in latest.timeline()))
+            st.text("\n".join(f"{name:<24} {value:>9}" for name, value in sorted(latest.counters.items())))
+            st.caption("Latest reruns")
+            st.text("\n".join(f"{rerun.started_at:%H:%M:%S} {rerun.session} {rerun.duration_ms:7.1f} ms"
+                               for rerun in reruns))
+        if st.button("🔬 Profile next rerun", key="profile_rerun_btn", use_container_width=True):
+            st.session_state.profile_next_rerun = True
+            st.rerun()
+        if 'rerun_profile' in st.session_state:
+            st.code(st.session_state.rerun_profile, language=None)
+        st.download_button("💾 Download metrics", data=instrumentation.metrics_text(), file_name="metrics.txt",
+                           key="metrics_download_btn", use_container_width=True)
+
 def main():
     """Main application"""
     st.title("📋 Account Task Management")
     
     # Sidebar for filters and stats
-    with st.sidebar:
+    with st.sidebar, instrumentation.span('sidebar'):
         st.header("📊 Dashboard")
         
-        # Calculate comprehensive stats
+        # Stats are maintained incrementally by the shared board; no pass over the tasks here
+        stats = st.session_state.stats.summary(date.today())
         total_accounts = len(st.session_state.accounts)
-        total_tasks = len(st.session_state.tasks)
-        pending_tasks = len([t for t in st.session_state.tasks if t['status'] == 'pending'])
-        in_progress_tasks = len([t for t in st.session_state.tasks if t['status'] == 'in_progress'])
-        completed_tasks = len([t for t in st.session_state.tasks if t['status'] == 'completed'])
-        overdue_tasks = len([t for t in st.session_state.tasks if (t['deadline'] - datetime.now()).days < 0])
+        total_tasks = stats['total_tasks']
+        pending_tasks = stats['pending_tasks']
+        in_progress_tasks = stats['in_progress_tasks']
+        completed_tasks = stats['completed_tasks']
+        overdue_tasks = stats['overdue_tasks']
         
-        # Calculate total hours
-        total_hours_all = sum(t['estimated_hours'] for t in st.session_state.tasks)
-        total_hours_pending = sum(t['estimated_hours'] for t in st.session_state.tasks if t['status'] == 'pending')
-        total_hours_in_progress = sum(t['estimated_hours'] for t in st.session_state.tasks if t['status'] == 'in_progress')
+        # Total hours
+        total_hours_all = stats['total_hours']
+        total_hours_pending = stats['pending_hours']
+        total_hours_in_progress = stats['in_progress_hours']
         
         # Display metrics
         col1, col2 = st.columns(2)
@@ -451,25 +711,43 @@ def main():
         st.metric("Pending Hours", f"{total_hours_pending}h")
         st.metric("Active Hours", f"{total_hours_in_progress}h")
         
+        # Per-account and per-stage breakdowns, only built (and the dataframe stack imported) once opened
+        with st.expander("📈 Breakdown", key="breakdown", on_change="rerun") as breakdown:
+            if breakdown.open:
+                st.caption("By account")
+                st.dataframe(st.session_state.stats.by_account(st.session_state.accounts), hide_index=True)
+                st.caption("By stage")
+                st.dataframe(st.session_state.stats.by_stage(st.session_state.accounts), hide_index=True)
+        
         st.divider()
         
-        # Filters
-        st.subheader("🔍 Filters")
-        account_filter = st.multiselect("Filter by Account", 
-                                      options=[acc['id'] for acc in st.session_state.accounts])
-        status_filter = st.multiselect("Filter by Status", 
-                                     options=["pending", "in_progress", "completed", "on_hold"])
+        # Search and filters; the task grid pushes them down to the board's search index
+        st.subheader("🔍 Search & Filters")
+        query = st.text_input("Search tasks", key="task_query",
+                              placeholder="Title, description, account or tech")
+        # Filter widgets are drawn below with counts for the current search, so read their state first
+        filters = tuple((facet, tuple(st.session_state.get(f"filter_{facet}", ())))
+                        for facet in FACETS if st.session_state.get(f"filter_{facet}"))
+        task_filter = (query, filters)
+        if task_filter != st.session_state.task_filter:
+            st.session_state.task_filter = task_filter
+            st.session_state.task_page = 0
+        page_size = st.session_state.task_page_size
+        facets = search_tasks(st.session_state.task_page * page_size, page_size).facets
         
-        # Apply filters (this would be used in the main display logic)
-        if account_filter or status_filter:
-            filtered_tasks = st.session_state.tasks
-            if account_filter:
-                filtered_tasks = [t for t in filtered_tasks if t['account_id'] in account_filter]
-            if status_filter:
-                filtered_tasks = [t for t in filtered_tasks if t['status'] in status_filter]
-            st.session_state.filtered_tasks = filtered_tasks
-        else:
-            st.session_state.filtered_tasks = st.session_state.tasks
+        def facet_filter(label: str, facet: str, options: List[str]):
+            counts = facets[facet]
+            st.multiselect(label, options=options, key=f"filter_{facet}",
+                           format_func=lambda value: f"{value} ({counts.get(value, 0)})")
+        
+        facet_filter("Filter by Account", "account", st.session_state.accounts.ids())
+        facet_filter("Filter by Status", "status", vocabulary.STATUSES)
+        facet_filter("Filter by Stage", "stage", vocabulary.STAGES)
+        facet_filter("Filter by Phase", "phase", vocabulary.PHASES)
+        facet_filter("Filter by Tech", "tech", vocabulary.TECH_STACK)
+        
+        if instrumentation.ENABLED:
+            render_metrics_overlay()
     
     # Main content - Tasks on top (larger section), Accounts on bottom
     
@@ -483,6 +761,16 @@ def main():
     with st.container():
         render_accounts_section()
     
+    st.divider()
+    
+    with st.container():
+        render_capacity_section()
+    
+    st.divider()
+    
+    with st.container():
+        render_bulk_io_section()
+    
     # Handle modals
     if st.session_state.show_task_modal:
         task_edit_modal()
@@ -490,5 +778,15 @@ def main():
     if st.session_state.show_account_modal:
         account_edit_modal()
 
+def save_profile(report: str):
+    """Keep the cProfile report of the last profiled rerun for the metrics overlay"""
+    st.session_state.rerun_profile = report
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        if st.session_state.pop('profile_next_rerun', False):
+            instrumentation.profile(main, save_profile)
+        else:
+            main()
+    finally:
+        instrumentation.end_rerun()
\ No newline at end of file
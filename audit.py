@@ -0,0 +1,230 @@
+"""Write-behind audit trail for task changes (TBL_TASK_HISTORY)
+
+``AuditLog.record`` computes the diff of one change, appends it to a local spool
+file and returns; nothing touches the database on the form submit path. A
+background thread flushes buffered entries to the backend in batches once
+``max_batch`` entries are waiting or ``flush_interval`` seconds have passed.
+Entries still in the spool when the process dies are replayed on the next start;
+the backend skips HISTORY_IDs it already stored, so a replay never duplicates
+rows. A failed flush is retried, except for entries the database rejects outright
+(a DB-API integrity, data or programming error): those are moved to a
+``.rejected`` file next to the spool so they cannot block the entries behind them.
+``record_bulk`` collapses a batch of bulk updates into one BULK_UPDATE entry.
+"""
+import atexit
+import json
+import os
+import threading
+import uuid
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from persistence import Backend
+
+INSERT, UPDATE, DELETE, BULK_UPDATE = 'INSERT', 'UPDATE', 'DELETE', 'BULK_UPDATE'
+
+# DB-API errors that retrying the same rows will not fix, matched by name across driver modules
+PERMANENT_ERRORS = ('DataError', 'IntegrityError', 'NotSupportedError', 'ProgrammingError')
+
+
+def diff(old: Optional[Dict], new: Optional[Dict]) -> Optional[Dict]:
+    """OLD_VALUES / NEW_VALUES for a change; updates keep only the fields that changed"""
+    if old is None:
+        return {'change_type': INSERT, 'old_values': None, 'new_values': _jsonable(new)}
+    if new is None:
+        return {'change_type': DELETE, 'old_values': _jsonable(old), 'new_values': None}
+    changed = [key for key in new if key != 'version' and old.get(key) != new[key]]
+    if not changed:
+        return None
+    return {
+        'change_type': UPDATE,
+        'old_values': _jsonable({key: old.get(key) for key in changed}),
+        'new_values': _jsonable({key: new[key] for key in changed}),
+    }
+
+
+class AuditLog:
+    """Buffers audit entries in memory and a spool file, flushing them in batches from a background thread"""
+
+    def __init__(self, backend: Backend, spool_path: str = 'audit_spool.jsonl',
+                 max_batch: int = 500, flush_interval: float = 5.0):
+        self.backend = backend
+        self.spool_path = spool_path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.flushed = 0
+        self.rejected = 0
+        self.last_error: Optional[Exception] = None
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()  # one flush at a time owns the .flushing file
+        self._stopped = False
+        self._recover()
+        self._spool = open(self.spool_path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='audit-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, task_id: str, old: Optional[Dict], new: Optional[Dict]) -> None:
+        """Queue the diff between two versions of a task (None for insert/delete)"""
+        change = diff(old, new)
+        if change is not None:
+            self._append(task_id, change)
+
+    def record_bulk(self, updates: List[Tuple[Dict, Dict]]) -> None:
+        """Queue one BULK_UPDATE entry for a batch of (old, new) task updates
+
+        OLD_VALUES maps each task id to its changed fields before the update and
+        NEW_VALUES holds the new field values plus ``task_ids``; bulk actions set the
+        same values on every task. TASK_ID is the first task, for the foreign key.
+        """
+        old_values, new_values = {}, {}
+        for old, new in updates:
+            change = diff(old, new)
+            if change is not None:
+                old_values[new['id']] = change['old_values']
+                new_values.update(change['new_values'])
+        if old_values:
+            self._append(next(iter(old_values)), {'change_type': BULK_UPDATE, 'old_values': old_values,
+                                                  'new_values': dict(new_values, task_ids=list(old_values))})
+
+    def _append(self, task_id: str, change: Dict) -> None:
+        entry = dict(change, history_id=str(uuid.uuid4()), task_id=task_id,
+                     changed_at=datetime.now().isoformat(sep=' '))
+        line = json.dumps(entry) + '\n'
+        with self._lock:
+            # Flushed to the OS right away so the entry survives a process crash
+            self._spool.write(line)
+            self._spool.flush()
+            self._buffer.append(entry)
+            if len(self._buffer) >= self.max_batch:
+                self._wake.notify()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """Write everything buffered to the backend now; returns the number of entries written"""
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            # Start a fresh spool; the old one is kept until the batch is safely stored
+            self._spool.close()
+            flushing_path = self.spool_path + '.flushing'
+            os.replace(self.spool_path, flushing_path)
+            self._spool = open(self.spool_path, 'a', encoding='utf-8')
+        retry: List[Dict] = []
+        try:
+            self.backend.insert_history(batch)
+            stored = len(batch)
+        except Exception as e:
+            self.last_error = e
+            if _permanent(e):
+                # Some entry will never go in; store the others one by one and set the bad ones aside
+                stored, retry = self._insert_each(batch)
+            else:
+                stored, retry = 0, batch
+        else:
+            self.last_error = None
+        if retry:
+            with self._lock:
+                # Put the rest back in front, and back into the live spool, before dropping the old file
+                self._buffer[:0] = retry
+                self._spool.writelines(json.dumps(entry) + '\n' for entry in retry)
+                self._spool.flush()
+                os.fsync(self._spool.fileno())
+        os.remove(flushing_path)
+        self.flushed += stored
+        return stored
+
+    def _insert_each(self, batch: List[Dict]) -> Tuple[int, List[Dict]]:
+        """(entries stored, entries to retry) after inserting one at a time and rejecting the failures"""
+        stored = 0
+        for i, entry in enumerate(batch):
+            try:
+                self.backend.insert_history([entry])
+            except Exception as e:
+                if not _permanent(e):
+                    return stored, batch[i:]
+                self._reject(entry, e)
+            else:
+                stored += 1
+        return stored, []
+
+    def _reject(self, entry: Dict, error: Exception) -> None:
+        with open(self.spool_path + '.rejected', 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(entry, error=f'{type(error).__name__}: {error}')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.rejected += 1
+
+    def close(self) -> None:
+        """Stop the background thread and flush what is left"""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._wake.notify()
+        self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+        self._spool.close()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                # Back off for a full interval after a failed flush
+                if not self._stopped and (len(self._buffer) < self.max_batch or self.last_error is not None):
+                    self._wake.wait(self.flush_interval)
+                if self._stopped:
+                    return
+                os.fsync(self._spool.fileno())
+            self.flush()
+
+    def _recover(self) -> None:
+        """Reload entries left in the spool files by a previous process"""
+        entries: Dict[str, Dict] = {}
+        for path in (self.spool_path + '.flushing', self.spool_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash mid-write
+                    entries[entry['history_id']] = entry
+        if not entries:
+            return
+        self._buffer = list(entries.values())
+        with open(self.spool_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry) + '\n' for entry in self._buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.spool_path + '.tmp', self.spool_path)
+        if os.path.exists(self.spool_path + '.flushing'):
+            os.remove(self.spool_path + '.flushing')
+
+
+def _permanent(error: Exception) -> bool:
+    return any(cls.__name__ in PERMANENT_ERRORS for cls in type(error).__mro__)
+
+
+def _jsonable(values: Optional[Dict]) -> Optional[Dict]:
+    if values is None:
+        return None
+    return {key: _json_value(value) for key, value in values.items()}
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, tuple):
+        return list(value)
+    return value
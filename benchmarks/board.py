@@ -0,0 +1,215 @@
+"""Render and edit-path benchmarks for app.py against a stored baseline
+
+For each portfolio size (see portfolio.py) a fresh interpreter loads the
+synthetic board through ATM_SEED_FILE and drives app.py headlessly with
+Streamlit's AppTest. It replays the task grid, the sidebar filters and search,
+and the task and account edit modals. For each scenario it reports per-rerun
+latency percentiles, and for each size the peak RSS and widget count of the
+board page. Results are compared with benchmarks/baseline.json and the exit
+status is 1 when something regressed::
+
+    python benchmarks/board.py                     # 1k, 10k and 100k tasks
+    python benchmarks/board.py --sizes 1000 --repeats 10
+    python benchmarks/board.py --update-baseline   # accept the current numbers
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import portfolio  # noqa: E402  (benchmarks/ is on sys.path when run as a script)
+
+APP = os.path.join(ROOT, 'app.py')
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SIZES = (1_000, 10_000, 100_000)
+PERCENTILES = (50, 90, 99)
+
+# A result regresses when it is this much worse than the baseline, and by more than the noise floor.
+# AppTest reruns are noisy, so the default only catches real step changes.
+# p99 is reported but not gated; with a handful of reruns it is the single slowest one
+TOLERANCE = 0.5
+NOISE_FLOOR_MS = 5.0
+GATED = ('p50', 'p90')
+
+
+def percentile(values: List[float], pct: int) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, -(-pct * len(ordered) // 100) - 1))]
+
+
+# --- child process: one board size -------------------------------------------------------------
+
+def _timed(at, action: Callable) -> float:
+    """Milliseconds for the rerun that ``action`` triggers (it must end with ``.run()``)"""
+    start = time.perf_counter()
+    action(at)
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed
+
+
+def _button(at, prefix: str):
+    return next(b for b in at.button if b.key and b.key.startswith(prefix))
+
+
+def _form_button(at, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+def _select_status(at):
+    selectbox = next(s for s in at.selectbox if s.label == "Status")
+    options = [o for o in selectbox.options if o != selectbox.value]
+    selectbox.select(options[0])
+
+
+def _scenarios() -> Dict[str, Callable]:
+    """name -> function(at, i) returning the latency of the measured rerun; each leaves the page as found"""
+    words = ['deploy', 'security', 'pipeline dash', 'acme 1']
+
+    def rerun(at, i):
+        return _timed(at, lambda at: at.run())
+
+    def next_page(at, i):
+        elapsed = _timed(at, lambda at: at.button(key="task_page_next").click().run())
+        at.button(key="task_page_prev").click().run()
+        return elapsed
+
+    def search(at, i):
+        elapsed = _timed(at, lambda at: at.text_input(key="task_query").input(words[i % len(words)]).run())
+        at.text_input(key="task_query").input("").run()
+        return elapsed
+
+    def filter_status(at, i):
+        elapsed = _timed(at, lambda at: at.multiselect(key="filter_status").select("pending").run())
+        at.multiselect(key="filter_status").unselect("pending").run()
+        return elapsed
+
+    def open_task_modal(at, i):
+        elapsed = _timed(at, lambda at: _button(at, "edit_task_").click().run())
+        _form_button(at, "Cancel").click().run()
+        return elapsed
+
+    def save_task(at, i):
+        _button(at, "edit_task_").click().run()
+        _select_status(at)
+        return _timed(at, lambda at: _form_button(at, "Update Task").click().run())
+
+    def open_account_modal(at, i):
+        elapsed = _timed(at, lambda at: _button(at, "edit_account_").click().run())
+        _form_button(at, "Cancel").click().run()
+        return elapsed
+
+    return {fn.__name__: fn for fn in (rerun, next_page, search, filter_status, open_task_modal, save_task,
+                                       open_account_modal)}
+
+
+def _widget_count(at) -> Dict[str, int]:
+    from streamlit.testing.v1.element_tree import Block, Widget
+
+    nodes = [node for root in (at.main, at.sidebar) for node in root]
+    return {'widgets': sum(isinstance(node, Widget) for node in nodes),
+            'elements': sum(not isinstance(node, Block) for node in nodes)}
+
+
+def run_size(repeats: int) -> Dict:
+    """Benchmark the board loaded from ATM_SEED_FILE in this process"""
+    import resource
+
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=600)
+    result = {'cold_ms': _timed(at, lambda at: at.run())}
+    result.update(_widget_count(at))
+    for name, scenario in _scenarios().items():
+        scenario(at, -1)  # warm-up: first renders of the elements this scenario touches
+        latencies = [scenario(at, i) for i in range(repeats)]
+        result[name] = {f'p{pct}': round(percentile(latencies, pct), 2) for pct in PERCENTILES}
+    # ru_maxrss is in kilobytes on Linux
+    result['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    result['cold_ms'] = round(result['cold_ms'], 1)
+    return result
+
+
+# --- parent: sizes, report and baseline ----------------------------------------------------------
+
+def measure(size: int, repeats: int) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        fixture = os.path.join(tmp, 'portfolio.json')
+        portfolio.write_fixture(fixture, size)
+        env = dict(os.environ, ATM_BACKEND='memory', ATM_SEED_FILE=fixture,
+                   ATM_AUDIT_SPOOL=os.path.join(tmp, 'audit_spool.jsonl'))
+        proc = subprocess.run([sys.executable, __file__, '--child', '--repeats', str(repeats)],
+                              capture_output=True, text=True, env=env, cwd=ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{size} tasks: benchmark failed\n{proc.stderr[-3000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            tolerance: float = TOLERANCE) -> Tuple[List[str], List[str]]:
+    """(report lines, regressions) of the results against the baseline"""
+    lines, regressions = [], []
+    for size, result in results.items():
+        base = baseline.get(size, {})
+        lines.append(f"{size} tasks: cold {result['cold_ms']:.0f} ms, peak RSS {result['peak_rss_mb']:.0f} MB, "
+                     f"{result['widgets']} widgets / {result['elements']} elements")
+        for key in ('cold_ms', 'peak_rss_mb', 'widgets'):
+            if key in base and result[key] > base[key] * (1 + tolerance) and result[key] > base[key] + 1:
+                regressions.append(f"{size} {key}: {base[key]} -> {result[key]}")
+        for name, stats in result.items():
+            if not isinstance(stats, dict):
+                continue
+            old = base.get(name, {})
+            cells = []
+            for key, value in stats.items():
+                cell = f"{key} {value:8.1f}"
+                if key in old:
+                    cell += f" ({(value - old[key]) / old[key] * 100 if old[key] else 0:+4.0f}%)"
+                    if key in GATED and value > old[key] * (1 + tolerance) and value - old[key] > NOISE_FLOOR_MS:
+                        regressions.append(f"{size} {name} {key}: {old[key]:.1f} -> {value:.1f} ms")
+                cells.append(cell)
+            lines.append(f"  {name:20} " + '   '.join(cells))
+    return lines, regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='task counts to benchmark')
+    parser.add_argument('--repeats', type=int, default=10, help='reruns per scenario')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed slowdown, as a fraction')
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(run_size(args.repeats)))
+        return 0
+    results = {str(size): measure(size, args.repeats) for size in args.sizes}
+    baseline: Dict[str, Dict] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    lines, regressions = compare(results, baseline, args.tolerance)
+    print('\n'.join(lines))
+    print(f"{len(regressions)} regression(s) against {args.baseline}")
+    for regression in regressions:
+        print(f"  {regression}")
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(dict(baseline, **results), f, indent=2, sort_keys=True)
+            f.write('\n')
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
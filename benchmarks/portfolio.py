@@ -0,0 +1,67 @@
+"""Synthetic account/task portfolios for benchmarks
+
+``write_fixture`` produces a seed fixture in the seed_data.json format (load it
+with ATM_SEED_FILE). Deadlines follow a realistic spread over the priority
+buckets and statuses lean towards open work, so the priority index, the cards
+and the dashboard see the same mix as a real board.
+"""
+import json
+import random
+from typing import Dict, List, Tuple
+
+import vocabulary
+
+# (share of tasks, first day, last day) relative to today, per deadline bucket
+DEADLINE_MIX = {
+    'overdue': (0.08, -30, -1),
+    'urgent': (0.12, 0, 3),
+    'high': (0.15, 4, 7),
+    'medium': (0.35, 8, 30),
+    'low': (0.30, 31, 120),
+}
+STATUS_MIX = {'pending': 0.45, 'in_progress': 0.30, 'completed': 0.20, 'on_hold': 0.05}
+HOURS = [1, 2, 3, 4, 6, 8, 12, 16, 24, 40, 80]
+
+_VERBS = ['Review', 'Deploy', 'Migrate', 'Audit', 'Tune', 'Document', 'Plan', 'Upgrade', 'Test', 'Onboard']
+_NOUNS = ['pipeline', 'dashboard', 'cluster', 'schema', 'integration', 'security policy', 'billing flow',
+          'data model', 'access controls', 'release']
+_DETAILS = ['with the customer team', 'before the quarterly review', 'for the new region', 'after the incident',
+            'ahead of go-live', 'for the renewal', 'per the architecture review', 'as agreed in the kickoff']
+
+
+def default_accounts(tasks: int) -> int:
+    return max(10, tasks // 200)
+
+
+def portfolio(tasks: int, accounts: int, seed: int = 0) -> Tuple[List[Dict], List[Dict]]:
+    """(accounts, tasks) in fixture form, reproducible for a given seed"""
+    rng = random.Random(seed)
+    account_rows = [{
+        'id': f'ACC{i:05d}',
+        'name': f'{rng.choice(["Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne"])} {i}',
+        'stage': rng.choice(vocabulary.STAGES),
+        'phase': rng.choice(vocabulary.PHASES),
+        'tech_stack': rng.sample(vocabulary.TECH_STACK, rng.randint(1, 4)),
+    } for i in range(accounts)]
+    buckets = list(DEADLINE_MIX.values())
+    statuses = list(STATUS_MIX)
+    task_rows = []
+    for i in range(tasks):
+        _, first, last = rng.choices(buckets, weights=[share for share, _, _ in buckets])[0]
+        noun = rng.choice(_NOUNS)
+        task_rows.append({
+            'id': f'TSK{i:07d}',
+            'account_id': account_rows[rng.randrange(accounts)]['id'],
+            'title': f'{rng.choice(_VERBS)} {noun}',
+            'description': f'{rng.choice(_VERBS)} the {noun} {rng.choice(_DETAILS)}',
+            'estimated_hours': rng.choice(HOURS),
+            'deadline_in_days': rng.randint(first, last),
+            'status': rng.choices(statuses, weights=list(STATUS_MIX.values()))[0],
+        })
+    return account_rows, task_rows
+
+
+def write_fixture(path: str, tasks: int, accounts: int = None, seed: int = 0) -> None:
+    account_rows, task_rows = portfolio(tasks, accounts or default_accounts(tasks), seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'accounts': account_rows, 'tasks': task_rows}, f)
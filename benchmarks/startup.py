@@ -0,0 +1,96 @@
+"""Cold-start timing for app.py
+
+Every sample runs in a fresh interpreter, like a container scaled up from zero,
+and times ``import streamlit``, the first AppTest run of app.py (the app's own
+imports, backend, option and board loads and the first render) and one warm
+rerun for comparison.
+
+Run it from the repository root, with the ATM_* variables of the setup to measure::
+
+    python benchmarks/startup.py --runs 5
+    ATM_BACKEND=sqlite ATM_SQLITE_PATH=/tmp/bench.db python benchmarks/startup.py --importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'app.py')
+
+# Modules that should stay out of a cold start until a page actually needs them
+DEFERRED = ('pandas', 'pyarrow', 'snowflake.connector')
+
+_CHILD = r'''
+import json, os, sys, time
+sys.path.insert(0, os.path.dirname(APP))
+os.chdir(os.path.dirname(APP))
+start = time.perf_counter()
+import streamlit
+imported = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(APP, default_timeout=120)
+at.run()
+if at.exception:
+    raise SystemExit(at.exception[0].value)
+done = time.perf_counter()
+loaded = [name for name in DEFERRED if name in sys.modules]
+at.run()
+print(json.dumps({'streamlit': imported - start, 'first_run': done - imported, 'cold_start': done - start,
+                  'rerun': time.perf_counter() - done, 'loaded': loaded}))
+'''
+
+
+def sample(importtime: bool = False) -> Dict:
+    """Time one cold start in a fresh interpreter"""
+    code = f"APP, DEFERRED = {APP!r}, {DEFERRED!r}\n" + _CHILD
+    with tempfile.TemporaryDirectory() as spool_dir:
+        env = dict(os.environ, ATM_AUDIT_SPOOL=os.environ.get('ATM_AUDIT_SPOOL', os.path.join(spool_dir, 'spool.jsonl')))
+        args = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+        proc = subprocess.run(args, capture_output=True, text=True, env=env, cwd=ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"cold start failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if importtime:
+        result['imports'] = _slowest_imports(proc.stderr)
+    return result
+
+
+def _slowest_imports(log: str, count: int = 15) -> List[str]:
+    """Top-level packages by cumulative import time, from ``-X importtime`` output"""
+    totals: Dict[str, int] = {}
+    for line in log.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            package = name.strip()
+            totals[package] = totals.get(package, 0) + int(cumulative)
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:count]
+    return [f"{name:40} {micros / 1000:8.1f} ms" for name, micros in ranked]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help='cold starts to sample')
+    parser.add_argument('--importtime', action='store_true', help='also list the slowest top-level imports')
+    args = parser.parse_args()
+    runs = [sample() for _ in range(args.runs)]
+    for phase in ('streamlit', 'first_run', 'cold_start', 'rerun'):
+        values = [run[phase] * 1000 for run in runs]
+        print(f"{phase:10} median {statistics.median(values):8.1f} ms"
+              f"   min {min(values):8.1f}   max {max(values):8.1f}")
+    loaded = sorted({name for run in runs for name in run['loaded']})
+    print(f"deferred modules loaded on first render: {', '.join(loaded) or 'none'}")
+    if args.importtime:
+        print("slowest imports:")
+        for line in sample(importtime=True)['imports']:
+            print('  ' + line)
+
+
+if __name__ == '__main__':
+    main()
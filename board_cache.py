@@ -0,0 +1,444 @@
+"""Process-wide, versioned cache of the task board shared by every session
+
+The board is held as a ``Board``: indexed ``AccountStore`` / ``TaskStore`` objects
+plus derived indexes such as the ``PriorityIndex``. All edits go through
+``BoardCache``, which writes them to the backend, patches the board in place,
+bumps ``version`` and drops derived cached results. Updates are compare-and-swap
+on the record version: the backend write happens outside the cache lock, and an
+edit made against an older version is merged field by field or raises
+``EditConflict``. Sessions remember the version they rendered and only re-fetch
+when it moves. Entries also expire after ``ttl_seconds`` (to pick up writes made
+by other processes) and the least recently used ones are evicted past
+``max_entries``. Task changes are handed to an optional ``AuditLog``, which
+records them in TBL_TASK_HISTORY off the request path.
+
+Backends that support deltas (see ``Backend.load_changes``) keep the board current
+without reloading it: every ``sync_seconds`` a poll fetches only the rows changed
+since the last watermark and patches them in, so the board entry never expires.
+With a ``BoardSnapshot`` store the board is also saved to disk now and then, and a
+new process starts from that snapshot plus one delta instead of reading the full
+tables.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import instrumentation
+from audit import AuditLog
+from board_snapshot import BoardSnapshot
+from capacity import CapacityPlan
+from card_render import CardCache
+from dashboard import DashboardStats
+from persistence import Backend, BoardDelta
+from priority_index import PriorityIndex
+from search_index import SearchIndex, SearchResult, query_key
+from task_store import AccountRecord, AccountStore, EditConflict, TaskRecord, TaskStore, merge_fields
+
+# Attempts at an update that keeps losing the race to other writers in this process
+CAS_ATTEMPTS = 3
+
+BOARD_KEY = ('board',)
+
+SYNC_SECONDS = 10.0
+SNAPSHOT_SECONDS = 600.0  # how often a changed board is written back to the snapshot
+
+
+class BoardCache:
+    """Versioned read-through cache in front of a persistence backend"""
+
+    def __init__(self, backend: Backend, ttl_seconds: float = 300.0, max_entries: int = 32,
+                 audit: Optional[AuditLog] = None, snapshot_store: Optional[BoardSnapshot] = None,
+                 sync_seconds: float = SYNC_SECONDS):
+        self.backend = backend
+        self.audit = audit
+        self.snapshot_store = snapshot_store
+        self.ttl_seconds = ttl_seconds
+        self.sync_seconds = sync_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.synced = 0  # rows applied by delta syncs
+        self.last_sync_error: Optional[Exception] = None
+        self._version = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._watermark: Optional[datetime] = None  # set while the board is kept current by delta syncs
+        self._synced_at = 0.0
+        self._saved_at = 0.0
+        self._saved_version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def poll(self) -> int:
+        """Expire stale entries, pull changes made elsewhere when a sync is due, and return the current version"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (loaded_at, _) in self._entries.items() if not self._fresh(key, loaded_at, now)]
+            for key in expired:
+                del self._entries[key]
+            if BOARD_KEY in expired:
+                # The backend may have changed underneath us; make sessions re-fetch
+                self._version += 1
+            sync = self._watermark is not None and BOARD_KEY in self._entries and now - self._synced_at >= self.sync_seconds
+            if sync:
+                self._synced_at = now  # other sessions polling meanwhile skip this round
+        if sync:
+            self.sync()
+        with self._lock:
+            if BOARD_KEY in self._entries and self._entries[BOARD_KEY][1].advance(date.today()):
+                # A new day moved tasks across deadline buckets
+                self._bump()
+            return self._version
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, loading it once if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(key, entry[0], time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                instrumentation.count('cache.hits')
+                return entry[1]
+            self.misses += 1
+            instrumentation.count('cache.misses')
+            with instrumentation.span(f'cache.load {key[0]}'):
+                value = loader()
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries and self._evict_oldest():
+                pass
+            return value
+
+    def sync(self) -> int:
+        """Patch the board with the rows changed in the backend since the last sync; returns how many were applied"""
+        watermark = self._watermark
+        if watermark is None:
+            return 0
+        try:
+            delta = self.backend.load_changes(watermark)
+        except Exception as e:
+            self.last_sync_error = e
+            return 0
+        self.last_sync_error = None
+        instrumentation.count('sync.rows', len(delta.accounts) + len(delta.tasks) + len(delta.deleted_tasks))
+        with self._lock:
+            entry = self._entries.get(BOARD_KEY)
+            if entry is None or self._watermark != watermark:
+                return 0  # reloaded or synced by someone else meanwhile
+            board = entry[1]
+            if any(account_id in board.accounts for account_id in delta.deleted_accounts):
+                # Accounts are not removed in place; rare enough to reload the board
+                self.invalidate()
+                return 0
+            applied = board.apply(delta)
+            self._watermark = delta.watermark
+            self.synced += applied
+            if applied:
+                self._bump()
+            if self._version != self._saved_version and time.monotonic() - self._saved_at >= SNAPSHOT_SECONDS:
+                self._save_snapshot(board)
+            return applied
+
+    def _evict_oldest(self) -> bool:
+        """Drop the least recently used entry other than the board itself"""
+        for key in self._entries:
+            if key != BOARD_KEY:
+                del self._entries[key]
+                return True
+        return False
+
+    def board(self) -> 'Board':
+        """The shared board; only this cache writes to it"""
+        return self.get(BOARD_KEY, self._load_board)
+
+    def snapshot(self) -> Tuple[int, 'Board']:
+        """(version, board) read atomically with respect to writes"""
+        with self._lock:
+            board = self.board()
+            return self._version, board
+
+    def search(self, query: str, filters: Dict[str, Tuple[str, ...]], offset: int, limit: int) -> SearchResult:
+        """One page of full-text / faceted search results with facet counts"""
+        key = ('search',) + query_key(query, filters) + (offset, limit)
+        return self.get(key, lambda: self.board().search(query, filters, offset, limit))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._version += 1
+
+    def add_account(self, account: Dict) -> None:
+        self.add_accounts([account])
+
+    def add_accounts(self, accounts: List[Dict]) -> None:
+        """Insert a batch of accounts with one backend call and one version bump
+
+        Raises ValueError when an id is already on the board or repeated in the batch;
+        Snowflake does not enforce the primary key, so nothing else would stop it.
+        """
+        if not accounts:
+            return
+        board = self.board()
+        records = [AccountRecord.from_dict(account) for account in accounts]
+        seen = set()
+        for record in records:
+            if record.id in board.accounts or record.id in seen:
+                raise ValueError(f"An account with id '{record.id}' already exists")
+            seen.add(record.id)
+        self.backend.add_accounts([record.to_dict() for record in records])
+        with self._lock:
+            for record in records:
+                board.put_account(record)
+            self._bump()
+
+    def update_account(self, account: Dict, base: Optional[AccountRecord] = None, force: bool = False) -> AccountRecord:
+        """Compare-and-swap update; ``base`` is the record the edit started from (see ``update_task``)"""
+        for _ in range(CAS_ATTEMPTS):
+            board = self.board()
+            current = board.accounts.get(account['id'])
+            if current is None:
+                raise EditConflict(account['id'])
+            record = current.replace(**dict(_merge(account, base, current, force), version=current.version + 1))
+            if not self.backend.update_account(record.to_dict()):
+                self._lost_race(board.accounts.get(account['id']), current)
+                continue
+            with self._lock:
+                try:
+                    board.put_account(record, expected_version=current.version)
+                except EditConflict:
+                    self.invalidate()  # stored, but this board copy moved on meanwhile
+                self._bump()
+            return record
+        raise EditConflict(account['id'], self.board().accounts.get(account['id']))
+
+    def add_task(self, task: Dict) -> None:
+        self.add_tasks([task])
+
+    def add_tasks(self, tasks: List[Dict]) -> None:
+        """Insert a batch of tasks with one backend call and one version bump"""
+        if not tasks:
+            return
+        board = self.board()
+        records = [TaskRecord.from_dict(task) for task in tasks]
+        self.backend.add_tasks([record.to_dict() for record in records])
+        with self._lock:
+            for record in records:
+                board.put_task(record)
+                if self.audit:
+                    self.audit.record(record.id, None, record.to_dict())
+            self._bump()
+
+    def update_task(self, task: Dict, base: Optional[TaskRecord] = None, force: bool = False) -> TaskRecord:
+        """Compare-and-swap update of one task
+
+        ``base`` is the record the edit started from. If someone saved the task since,
+        only the fields this edit changed are applied on top of their version, and
+        ``EditConflict`` is raised when both changed the same field, unless ``force``
+        (this edit wins those fields). Without ``base`` the given fields overwrite the
+        latest version.
+        """
+        for _ in range(CAS_ATTEMPTS):
+            board = self.board()
+            current = board.tasks.get(task['id'])
+            if current is None:
+                raise EditConflict(task['id'])
+            record = current.replace(**dict(_merge(task, base, current, force), version=current.version + 1))
+            if not self.backend.update_task(record.to_dict()):
+                self._lost_race(board.tasks.get(task['id']), current)
+                continue
+            with self._lock:
+                try:
+                    board.put_task(record, expected_version=current.version)
+                except EditConflict:
+                    self.invalidate()  # stored, but this board copy moved on meanwhile
+                if self.audit:
+                    self.audit.record(record.id, current.to_dict(), record.to_dict())
+                self._bump()
+            return record
+        raise EditConflict(task['id'], self.board().tasks.get(task['id']))
+
+    def update_tasks(self, task_ids: List[str], changes: Dict) -> Tuple[List[TaskRecord], List[str]]:
+        """Set the same fields on many tasks: one backend call, one version bump and one audit entry per attempt
+
+        Returns (updated records, skipped ids). Tasks that already have the values are
+        left alone; tasks that were deleted, or that keep losing the version race to
+        other writers, are skipped.
+        """
+        updated, pending, skipped = [], list(task_ids), []
+        for _ in range(CAS_ATTEMPTS):
+            board = self.board()
+            batch = []
+            for task_id in pending:
+                current = board.tasks.get(task_id)
+                if current is None:
+                    skipped.append(task_id)
+                elif any(getattr(current, field) != value for field, value in changes.items()):
+                    batch.append((current, current.replace(**dict(changes, version=current.version + 1))))
+            stale = set(self.backend.update_tasks([record.to_dict() for _, record in batch]))
+            applied = [(current, record) for current, record in batch if record.id not in stale]
+            with self._lock:
+                for current, record in applied:
+                    try:
+                        board.put_task(record, expected_version=current.version)
+                    except EditConflict:
+                        self.invalidate()  # stored, but this board copy moved on meanwhile
+                if self.audit and applied:
+                    self.audit.record_bulk([(current.to_dict(), record.to_dict()) for current, record in applied])
+                if applied:
+                    self._bump()
+            updated.extend(record for _, record in applied)
+            lost = [current for current, _ in batch if current.id in stale]
+            for current in lost:
+                self._lost_race(board.tasks.get(current.id), current)
+            pending = [current.id for current in lost]
+            if not pending:
+                break
+        return updated, skipped + pending
+
+    def delete_task(self, task_id: str) -> None:
+        board = self.board()
+        current = board.tasks.get(task_id)
+        self.backend.delete_task(task_id)
+        with self._lock:
+            board.drop_task(task_id)
+            if self.audit and current is not None:
+                self.audit.record(task_id, current.to_dict(), None)
+            self._bump()
+
+    def _lost_race(self, latest, attempted) -> None:
+        """The backend rejected a write based on ``attempted``; reload the board unless it already has a newer record"""
+        if latest is None or latest.version <= attempted.version:
+            # Changed or deleted by another process (or a writer here that has not patched the board yet)
+            self.invalidate()
+
+    def _load_board(self) -> 'Board':
+        stored = self.snapshot_store.load() if self.snapshot_store else None
+        if stored is None:
+            delta = self.backend.load_changes()
+            accounts, tasks = delta.accounts, delta.tasks
+        else:
+            # The snapshot plus what changed since it was taken
+            delta = self.backend.load_changes(stored.watermark)
+            accounts, tasks = _patched(stored.accounts, stored.tasks, delta)
+        instrumentation.count('rows.loaded', len(delta.accounts) + len(delta.tasks))
+        self._watermark = delta.watermark
+        self._synced_at = time.monotonic()
+        board = Board(AccountStore(AccountRecord.from_dict(a) for a in accounts),
+                      TaskStore(TaskRecord.from_dict(t) for t in tasks))
+        if stored is None or delta.accounts or delta.tasks or delta.deleted_tasks:
+            self._save_snapshot(board)
+        return board
+
+    def _save_snapshot(self, board: 'Board') -> None:
+        """Write the board to the snapshot on a background thread"""
+        if self.snapshot_store is None or self._watermark is None:
+            return
+        self._saved_at = time.monotonic()
+        self._saved_version = self._version
+        accounts, tasks = list(board.accounts), list(board.tasks)
+        threading.Thread(target=self.snapshot_store.save, args=(accounts, tasks, self._watermark),
+                         name='board-snapshot', daemon=True).start()
+
+    def _fresh(self, key: Hashable, loaded_at: float, now: float) -> bool:
+        # A board kept current by delta syncs does not expire
+        return (key == BOARD_KEY and self._watermark is not None) or now - loaded_at < self.ttl_seconds
+
+    def _bump(self) -> None:
+        """New version after a write; the board was patched in place, derived entries are dropped"""
+        board = self._entries.get(BOARD_KEY)
+        self._entries.clear()
+        if board is not None:
+            self._entries[BOARD_KEY] = board
+        self._version += 1
+
+
+class Board:
+    """Account/task stores plus the indexes derived from them, kept in step on every write"""
+
+    def __init__(self, accounts: AccountStore, tasks: TaskStore, today: Optional[date] = None):
+        self.accounts = accounts
+        self.tasks = tasks
+        self.priorities = PriorityIndex(tasks, today)
+        self.stats = DashboardStats(tasks)
+        self.capacity = CapacityPlan(tasks, today)
+        self.cards = CardCache()
+        self.search_index = SearchIndex(accounts, tasks)
+
+    def put_account(self, account: AccountRecord, expected_version: Optional[int] = None) -> None:
+        self.accounts.upsert(account, expected_version)
+        self.search_index.put_account(account)
+
+    def put_task(self, task: TaskRecord, expected_version: Optional[int] = None) -> None:
+        if expected_version is None:
+            old = self.tasks.get(task.id)
+            self.tasks.insert(task)
+        else:
+            old = self.tasks.update(task, expected_version)
+        self.priorities.upsert(task)
+        self.search_index.put_task(task)
+        self.capacity.upsert(task)
+        if old is not None:
+            self.stats.remove(old)
+        self.stats.add(task)
+
+    def drop_task(self, task_id: str) -> None:
+        old = self.tasks.delete(task_id)
+        self.priorities.remove(task_id)
+        self.search_index.drop_task(task_id)
+        self.capacity.remove(task_id)
+        self.cards.evict(task_id)
+        if old is not None:
+            self.stats.remove(old)
+
+    def apply(self, delta: BoardDelta) -> int:
+        """Patch in records changed elsewhere; returns how many were newer than ours (our own writes are skipped)"""
+        applied = 0
+        for account in delta.accounts:
+            current = self.accounts.get(account['id'])
+            if current is None or current.version < account['version']:
+                self.put_account(AccountRecord.from_dict(account))
+                applied += 1
+        for task in delta.tasks:
+            current = self.tasks.get(task['id'])
+            if current is None or current.version < task['version']:
+                self.put_task(TaskRecord.from_dict(task))
+                applied += 1
+        for task_id in delta.deleted_tasks:
+            if task_id in self.tasks:
+                self.drop_task(task_id)
+                applied += 1
+        return applied
+
+    def search(self, query: str, filters: Dict[str, Tuple[str, ...]], offset: int, limit: int) -> SearchResult:
+        return self.search_index.search(query, filters, self.priorities, limit, offset)
+
+    def advance(self, today: date) -> bool:
+        """Roll time-dependent indexes forward; True if anything was re-scored or re-spread"""
+        rescored = self.priorities.advance(today) > 0
+        return self.capacity.advance(today) or rescored
+
+
+def _merge(edit: Dict, base, current, force: bool = False) -> Dict:
+    """Fields to write: all of ``edit`` when it was made against ``current``, else a per-field merge"""
+    if base is None or base.version == current.version:
+        return edit
+    changes, conflicts = merge_fields(base.to_dict(), edit, current.to_dict())
+    if conflicts and not force:
+        raise EditConflict(current.id, current, conflicts)
+    return dict(changes, **{field: edit[field] for field in conflicts})
+
+
+def _patched(accounts: List[Dict], tasks: List[Dict], delta: BoardDelta) -> Tuple[List[Dict], List[Dict]]:
+    """Snapshot rows with a delta applied; the backend's rows win"""
+    deleted = set(delta.deleted_accounts)
+    by_id = {account['id']: account for account in accounts if account['id'] not in deleted}
+    by_id.update((account['id'], account) for account in delta.accounts)
+    task_by_id = {task['id']: task for task in tasks if task['account_id'] not in deleted}
+    task_by_id.update((task['id'], task) for task in delta.tasks)
+    for task_id in delta.deleted_tasks:
+        task_by_id.pop(task_id, None)
+    return list(by_id.values()), list(task_by_id.values())
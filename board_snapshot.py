@@ -0,0 +1,128 @@
+"""On-disk columnar copy of the board, so a new process reads a delta instead of the full tables
+
+``BoardSnapshot.save`` writes the accounts and the tasks as Arrow IPC files in a
+directory, tagged with the backend ``source`` and the sync watermark they are
+current to. ``load`` memory-maps them back. ``BoardCache`` starts from the
+snapshot and then asks the backend only for rows changed since its watermark.
+Needs pyarrow, which is imported only when a snapshot is read or written; without
+it, or when the files belong to another database, ``load`` returns None and the
+board is read in full. ``source`` carries the DATABASE_ID the tables were created
+with, so a database recreated at the same path or connection is another database.
+"""
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from task_store import AccountRecord, TaskRecord, whole_hours
+
+FORMAT = '1'  # bump when the columns change; older snapshots are then ignored
+
+
+class Snapshot(NamedTuple):
+    accounts: List[Dict]
+    tasks: List[Dict]
+    watermark: datetime
+
+
+class BoardSnapshot:
+    """Accounts and tasks of one backend, stored as Arrow files under ``directory``"""
+
+    def __init__(self, directory: str, source: str):
+        self.directory = directory
+        self.source = source
+        self.last_error: Optional[Exception] = None
+        self._lock = threading.Lock()  # one writer at a time
+
+    def load(self) -> Optional[Snapshot]:
+        """The stored snapshot, or None when there is none usable for this source"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return None
+        try:
+            accounts = _read(pa, self._path('accounts'))
+            tasks = _read(pa, self._path('tasks'))
+        except (OSError, pa.ArrowException) as e:
+            self.last_error = e
+            return None
+        meta = tasks.schema.metadata or {}
+        if (meta.get(b'source', b'').decode() != self.source or meta.get(b'format', b'').decode() != FORMAT
+                or (accounts.schema.metadata or {}).get(b'watermark') != meta.get(b'watermark')):
+            return None
+        return Snapshot(_account_dicts(accounts), _task_dicts(tasks),
+                        datetime.fromisoformat(meta[b'watermark'].decode()))
+
+    def save(self, accounts: Iterable[AccountRecord], tasks: Iterable[TaskRecord], watermark: datetime) -> bool:
+        """Replace the stored snapshot; False (with ``last_error`` set) if it could not be written"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            return False
+        meta = {'source': self.source, 'format': FORMAT, 'watermark': watermark.isoformat()}
+        accounts, tasks = list(accounts), list(tasks)
+        try:
+            with self._lock:
+                os.makedirs(self.directory, exist_ok=True)
+                # Tasks last: load() only trusts the pair when both carry the same watermark
+                _write(pa, self._path('accounts'), pa.table({
+                    'id': [a.id for a in accounts],
+                    'name': [a.name for a in accounts],
+                    'stage': pa.array([a.stage for a in accounts]).dictionary_encode(),
+                    'phase': pa.array([a.phase for a in accounts]).dictionary_encode(),
+                    'tech_stack': pa.array([list(a.tech_stack) for a in accounts], pa.list_(pa.string())),
+                    'version': pa.array([a.version for a in accounts], pa.int64()),
+                }), meta)
+                _write(pa, self._path('tasks'), pa.table({
+                    'id': [t.id for t in tasks],
+                    'account_id': pa.array([t.account_id for t in tasks]).dictionary_encode(),
+                    'title': [t.title for t in tasks],
+                    'description': [t.description for t in tasks],
+                    'estimated_hours': pa.array([float(t.estimated_hours) for t in tasks], pa.float64()),
+                    'deadline': pa.array([t.deadline for t in tasks], pa.timestamp('us')),
+                    'status': pa.array([t.status for t in tasks]).dictionary_encode(),
+                    'created_at': pa.array([t.created_at for t in tasks], pa.timestamp('us')),
+                    'version': pa.array([t.version for t in tasks], pa.int64()),
+                }), meta)
+        except (OSError, pa.ArrowException) as e:
+            self.last_error = e
+            return False
+        self.last_error = None
+        return True
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f'{name}.arrow')
+
+
+def _write(pa, path: str, table, meta: Dict[str, str]) -> None:
+    table = table.replace_schema_metadata(meta)
+    with pa.OSFile(path + '.tmp', 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(path + '.tmp', path)
+
+
+def _read(pa, path: str):
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _columns(table) -> Dict[str, list]:
+    return {name: table.column(name).to_pylist() for name in table.column_names}
+
+
+def _account_dicts(table) -> List[Dict]:
+    c = _columns(table)
+    return [{'id': id, 'name': name, 'stage': stage, 'phase': phase, 'tech_stack': tech_stack, 'version': version}
+            for id, name, stage, phase, tech_stack, version
+            in zip(c['id'], c['name'], c['stage'], c['phase'], c['tech_stack'], c['version'])]
+
+
+def _task_dicts(table) -> List[Dict]:
+    c = _columns(table)
+    hours = [whole_hours(h) for h in c['estimated_hours']]
+    return [{'id': id, 'account_id': account_id, 'title': title, 'description': description,
+             'estimated_hours': estimated_hours, 'deadline': deadline, 'status': status,
+             'created_at': created_at, 'version': version}
+            for id, account_id, title, description, estimated_hours, deadline, status, created_at, version
+            in zip(c['id'], c['account_id'], c['title'], c['description'], hours, c['deadline'], c['status'],
+                   c['created_at'], c['version'])]
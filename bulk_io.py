@@ -0,0 +1,320 @@
+"""Bulk CSV / Parquet import and export of accounts and tasks
+
+Imports stream the file in chunks: every chunk is validated against the stage,
+phase, status and tech vocabularies, gets ids generated in one batch, and is
+written to the board with one batched insert. A file that cannot be read to the
+end or a failed insert stops the import; chunks stored before that stay, and the
+result says how many rows they hold. Exports stream records out in chunks.
+Parquet support needs ``pyarrow`` and is imported only when used.
+"""
+import csv
+import io
+import math
+import os
+import uuid
+from datetime import date, datetime
+from typing import IO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import vocabulary
+from board_cache import BoardCache
+from task_store import MIN_HOURS, AccountRecord, TaskRecord, whole_hours
+
+TASK_COLUMNS = ['id', 'account_id', 'title', 'description', 'estimated_hours', 'deadline', 'status', 'created_at']
+ACCOUNT_COLUMNS = ['id', 'name', 'stage', 'phase', 'tech_stack']
+FORMATS = ('csv', 'parquet')
+CHUNK_SIZE = 5000
+
+# Called with (fraction of the input consumed, rows imported so far)
+ProgressCallback = Callable[[float, int], None]
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    errors: List[Tuple[int, str]]  # (1-based data row number, message)
+    failure: Optional[str] = None  # why the import stopped early; the ``imported`` rows before it are stored
+
+
+def new_ids(count: int) -> List[str]:
+    """``count`` random UUID4 strings drawn from a single os.urandom call"""
+    raw = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * count, 16)]
+
+
+def read_chunks(file: IO[bytes], fmt: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[List[Dict], float]]:
+    """Yield (rows, fraction of the input consumed) without loading the whole file"""
+    if fmt == 'csv':
+        size = _size(file)
+        reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+        chunk: List[Dict] = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk, _fraction(file, size)
+                chunk = []
+        if chunk:
+            yield chunk, 1.0
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(file)
+        total, done = max(parquet.metadata.num_rows, 1), 0
+        for batch in parquet.iter_batches(batch_size=chunk_size):
+            done += batch.num_rows
+            yield batch.to_pylist(), done / total
+    else:
+        raise ValueError(f"Unsupported format '{fmt}' (expected one of {', '.join(FORMATS)})")
+
+
+def import_tasks(file: IO[bytes], fmt: str, board_cache: BoardCache, chunk_size: int = CHUNK_SIZE,
+                 progress: Optional[ProgressCallback] = None) -> ImportResult:
+    """Validate and insert tasks chunk by chunk; invalid rows are skipped and reported"""
+    board = board_cache.board()
+    imported, errors, row_offset = 0, [], 0
+    seen_ids: Set[str] = set()
+    try:
+        for rows, fraction in read_chunks(file, fmt, chunk_size):
+            tasks, chunk_errors = validate_tasks(rows, board.accounts, board.tasks, seen_ids, row_offset)
+            errors.extend(chunk_errors)
+            row_offset += len(rows)
+            missing = [task for task in tasks if not task['id']]
+            for task, task_id in zip(missing, new_ids(len(missing))):
+                task['id'] = task_id
+            board_cache.add_tasks(tasks)
+            imported += len(tasks)
+            if progress:
+                progress(fraction, imported)
+    except ImportError:
+        raise
+    except Exception as e:
+        # Undecodable or corrupt input, or a failed insert
+        return ImportResult(imported, errors, f"{type(e).__name__}: {e}")
+    return ImportResult(imported, errors)
+
+
+def import_accounts(file: IO[bytes], fmt: str, board_cache: BoardCache, chunk_size: int = CHUNK_SIZE,
+                    progress: Optional[ProgressCallback] = None) -> ImportResult:
+    """Validate and insert accounts chunk by chunk; invalid rows are skipped and reported"""
+    board = board_cache.board()
+    imported, errors, row_offset = 0, [], 0
+    seen_ids: Set[str] = set()
+    try:
+        for rows, fraction in read_chunks(file, fmt, chunk_size):
+            accounts, chunk_errors = validate_accounts(rows, board.accounts, seen_ids, row_offset)
+            errors.extend(chunk_errors)
+            row_offset += len(rows)
+            board_cache.add_accounts(accounts)
+            imported += len(accounts)
+            if progress:
+                progress(fraction, imported)
+    except ImportError:
+        raise
+    except Exception as e:
+        # Undecodable or corrupt input, or a failed insert
+        return ImportResult(imported, errors, f"{type(e).__name__}: {e}")
+    return ImportResult(imported, errors)
+
+
+def validate_tasks(rows: List[Dict], accounts, tasks, seen_ids: Set[str],
+                   row_offset: int = 0) -> Tuple[List[Dict], List[Tuple[int, str]]]:
+    """Normalize task rows; returns (valid task dicts, errors). ``seen_ids`` tracks ids across chunks"""
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=row_offset + 1):
+        try:
+            task_id = _text(row.get('id'))
+            if task_id and (task_id in tasks or task_id in seen_ids):
+                raise ValueError(f"duplicate id '{task_id}'")
+            account_id = _text(row.get('account_id'))
+            if account_id not in accounts:
+                raise ValueError(f"unknown account '{account_id}'")
+            title = _text(row.get('title'))
+            if not title:
+                raise ValueError("title is required")
+            hours = _number(row.get('estimated_hours'))
+            if hours < MIN_HOURS:
+                raise ValueError(f"estimated_hours must be at least {MIN_HOURS:g}")
+            task = {
+                'id': task_id,
+                'account_id': account_id,
+                'title': title,
+                'description': _text(row.get('description')),
+                'estimated_hours': hours,
+                'deadline': datetime.combine(_date(row.get('deadline')), datetime.min.time()),
+                'status': _choice(row.get('status') or 'pending', vocabulary.STATUSES, 'status'),
+                'created_at': _datetime(row.get('created_at')),
+            }
+        except (TypeError, ValueError) as e:
+            errors.append((number, str(e)))
+            continue
+        if task_id:
+            seen_ids.add(task_id)
+        valid.append(task)
+    return valid, errors
+
+
+def validate_accounts(rows: List[Dict], accounts, seen_ids: Set[str],
+                      row_offset: int = 0) -> Tuple[List[Dict], List[Tuple[int, str]]]:
+    """Normalize account rows; returns (valid account dicts, errors)"""
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=row_offset + 1):
+        try:
+            name = _text(row.get('name'))
+            if not name:
+                raise ValueError("name is required")
+            # Same id rule as the ADD ACCOUNT form
+            account_id = _text(row.get('id')) or name.upper().replace(' ', '_')
+            if account_id in accounts or account_id in seen_ids:
+                raise ValueError(f"duplicate id '{account_id}'")
+            tech_stack = row.get('tech_stack') or []
+            if isinstance(tech_stack, str):
+                tech_stack = [t for t in tech_stack.split(';') if t.strip()]
+            account = {
+                'id': account_id,
+                'name': name,
+                'stage': _choice(row.get('stage'), vocabulary.STAGES, 'stage'),
+                'phase': _choice(row.get('phase'), vocabulary.PHASES, 'phase'),
+                'tech_stack': [_choice(t, vocabulary.TECH_STACK, 'tech_stack') for t in tech_stack],
+            }
+        except (TypeError, ValueError) as e:
+            errors.append((number, str(e)))
+            continue
+        seen_ids.add(account_id)
+        valid.append(account)
+    return valid, errors
+
+
+def export_tasks(tasks: Iterable[TaskRecord], fmt: str, out: IO[bytes], chunk_size: int = CHUNK_SIZE) -> None:
+    """Write tasks to ``out`` in chunks"""
+    _export((_task_row(task) for task in tasks), TASK_COLUMNS, fmt, out, chunk_size)
+
+
+def export_accounts(accounts: Iterable[AccountRecord], fmt: str, out: IO[bytes], chunk_size: int = CHUNK_SIZE) -> None:
+    """Write accounts to ``out`` in chunks"""
+    _export((_account_row(account) for account in accounts), ACCOUNT_COLUMNS, fmt, out, chunk_size)
+
+
+def _export(rows: Iterable[Dict], columns: List[str], fmt: str, out: IO[bytes], chunk_size: int) -> None:
+    if fmt == 'csv':
+        text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+        writer = csv.DictWriter(text, fieldnames=columns)
+        writer.writeheader()
+        for chunk in _chunks(rows, chunk_size):
+            writer.writerows({**row, 'tech_stack': ';'.join(row['tech_stack'])} if 'tech_stack' in row else row
+                             for row in chunk)
+        text.detach()  # leave ``out`` open for the caller
+    elif fmt == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # One explicit schema: inferring it per chunk gives int64 hours when the first chunk is all whole hours
+        schema = _arrow_schema(pa, columns)
+        with pq.ParquetWriter(out, schema) as writer:
+            for chunk in _chunks(rows, chunk_size):
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+    else:
+        raise ValueError(f"Unsupported format '{fmt}' (expected one of {', '.join(FORMATS)})")
+
+
+def _arrow_schema(pa, columns: List[str]):
+    """Parquet column types for TASK_COLUMNS / ACCOUNT_COLUMNS; anything not listed is a string"""
+    types = {
+        'estimated_hours': pa.float64(),
+        'deadline': pa.date32(),
+        'created_at': pa.timestamp('us'),
+        'tech_stack': pa.list_(pa.string()),
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+
+def _task_row(task: TaskRecord) -> Dict:
+    return {
+        'id': task.id,
+        'account_id': task.account_id,
+        'title': task.title,
+        'description': task.description,
+        'estimated_hours': task.estimated_hours,
+        'deadline': task.deadline.date(),
+        'status': task.status,
+        'created_at': task.created_at,
+    }
+
+
+def _account_row(account: AccountRecord) -> Dict:
+    return {
+        'id': account.id,
+        'name': account.name,
+        'stage': account.stage,
+        'phase': account.phase,
+        'tech_stack': list(account.tech_stack),
+    }
+
+
+def _chunks(rows: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk: List[Dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _text(value) -> str:
+    return '' if value is None else str(value).strip()
+
+
+def _number(value) -> float:
+    if value is None or value == '':
+        raise ValueError("estimated_hours is required")
+    hours = float(value)
+    # nan would pass the minimum check and turn every hours total into nan; inf breaks scores and capacity
+    if not math.isfinite(hours):
+        raise ValueError(f"invalid estimated_hours '{value}'")
+    return whole_hours(hours)
+
+
+def _date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not value:
+        raise ValueError("deadline is required")
+    try:
+        return date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        raise ValueError(f"invalid deadline '{value}' (expected YYYY-MM-DD)")
+
+
+def _datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return datetime.now()
+    return datetime.fromisoformat(str(value).strip())
+
+
+def _choice(value, options: List[str], field: str) -> str:
+    """Accept a display value or its LKP_* code"""
+    choice = vocabulary.from_code(vocabulary.to_code(_text(value)), options)
+    if choice not in options:
+        raise ValueError(f"invalid {field} '{value}' (expected one of {', '.join(options)})")
+    return choice
+
+
+def _size(file: IO[bytes]) -> int:
+    try:
+        position = file.tell()
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        file.seek(position)
+        return max(size, 1)
+    except (AttributeError, OSError):
+        return 0
+
+
+def _fraction(file: IO[bytes], size: int) -> float:
+    try:
+        return min(file.tell() / size, 1.0) if size else 0.0
+    except (AttributeError, OSError):
+        return 0.0
@@ -0,0 +1,107 @@
+"""Background queue for bulk task updates: reassign, re-date or change the status of many tasks
+
+``BulkQueue.submit`` records a ``BulkJob`` and returns at once; a small worker
+pool applies it to the board in batches of ``batch_size`` through
+``BoardCache.update_tasks``, so every batch is one backend call, one version bump
+and one BULK_UPDATE audit entry. Workers update the job's progress counters as
+they go and the UI polls them, so the submitting session is never blocked on the
+writes. Finished jobs are kept for a while so their outcome can still be shown.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from board_cache import BoardCache
+
+BATCH_SIZE = 500
+WORKERS = 2
+KEEP_FINISHED = 50
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+# Task fields a bulk action may set
+BULK_FIELDS = ('account_id', 'deadline', 'status')
+
+
+class BulkJob:
+    """One bulk action; the worker writes the progress fields, sessions only read them"""
+
+    def __init__(self, task_ids: Iterable[str], changes: Dict, label: str = '', session: str = ''):
+        self.id = uuid.uuid4().hex
+        self.task_ids = list(task_ids)
+        self.changes = dict(changes)
+        self.label = label
+        self.session = session
+        self.state = QUEUED
+        self.processed = 0
+        self.updated = 0
+        self.skipped: List[str] = []  # deleted, or kept changing under the job
+        self.error: Optional[Exception] = None
+        self.submitted_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.task_ids)
+
+    @property
+    def progress(self) -> float:
+        return self.processed / self.total if self.total else 1.0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+
+class BulkQueue:
+    """Runs bulk jobs against a board cache on a pool of background threads"""
+
+    def __init__(self, board: BoardCache, workers: int = WORKERS, batch_size: int = BATCH_SIZE):
+        self.board = board
+        self.batch_size = batch_size
+        self._jobs: 'OrderedDict[str, BulkJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-ops')
+
+    def submit(self, task_ids: Iterable[str], changes: Dict, label: str = '', session: str = '') -> BulkJob:
+        """Queue ``changes`` (fields from BULK_FIELDS) for every task id"""
+        unknown = set(changes) - set(BULK_FIELDS)
+        if unknown:
+            raise ValueError(f"bulk actions cannot set {', '.join(sorted(unknown))}")
+        job = BulkJob(task_ids, changes, label, session)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[BulkJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def close(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: BulkJob) -> None:
+        job.state = RUNNING
+        try:
+            for start in range(0, job.total, self.batch_size):
+                batch = job.task_ids[start:start + self.batch_size]
+                updated, skipped = self.board.update_tasks(batch, job.changes)
+                job.updated += len(updated)
+                job.skipped.extend(skipped)
+                job.processed += len(batch)
+            job.state = DONE
+        except Exception as e:
+            job.error = e
+            job.state = FAILED
+        job.finished_at = datetime.now()
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs past KEEP_FINISHED"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self._jobs[job_id]
@@ -0,0 +1,264 @@
+"""Capacity planning: open task hours spread over the working days up to each deadline
+
+``CapacityPlan`` spreads the ``estimated_hours`` of every open task evenly over
+the working days from today to its deadline (overdue work lands on the first
+working day) across a ``HORIZON_DAYS`` window, and sums the result into daily
+and weekly load matrices per account and per status.
+
+Each task adds its daily rate to one row over a run of days that always starts
+at today's column, so a row is kept as a difference array and its daily load is
+the running sum. The whole plan is built with numpy in one pass, and a single
+task write only touches the difference entries of its old and new rows; those
+rows are marked dirty and re-summed on the next read. Windows where an account's
+load goes over ``daily_capacity`` are reported as ``Overload`` runs.
+"""
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+import vocabulary
+from dashboard import CLOSED_STATUSES
+from task_store import TaskRecord
+
+HORIZON_DAYS = 365
+DAILY_CAPACITY = 8.0  # hours one account's team can work per working day
+GROUPINGS = ('account', 'status')
+
+_EPOCH = date(1970, 1, 1).toordinal()
+_EPSILON = 1e-6  # float drift left behind by incremental updates
+
+
+class Load(NamedTuple):
+    keys: List[str]  # account ids or statuses, one per row
+    dates: List[date]  # working day, or the Monday of the week, per column
+    hours: np.ndarray  # rows x columns
+
+
+class Overload(NamedTuple):
+    account_id: str
+    start: date
+    end: date  # last working day of the window, inclusive
+    days: int  # working days
+    peak_hours: float
+    excess_hours: float  # hours over capacity across the window
+
+
+class _Rollup:
+    """Daily load of one grouping (rows) as difference arrays, re-summed per dirty row"""
+
+    def __init__(self, days: int):
+        self._days = days
+        self._diff = np.zeros((0, days + 1))
+        self._load = np.zeros((0, days))
+        self._dirty: Set[int] = set()
+
+    def rebuild(self, rows: np.ndarray, ends: np.ndarray, rates: np.ndarray, row_count: int) -> None:
+        width = self._days + 1
+        size = row_count * width
+        live = rates != 0
+        rows, ends, rates = rows[live], ends[live], rates[live]
+        starts = np.bincount(rows * width, weights=rates, minlength=size)
+        stops = np.bincount(rows * width + ends, weights=rates, minlength=size)
+        self._diff = (starts - stops).reshape(row_count, width)
+        self._load = _running_sum(self._diff)
+        self._dirty.clear()
+
+    def add(self, row: int, end: int, rate: float) -> None:
+        if row >= len(self._diff):
+            grow = row + 1 - len(self._diff)
+            self._diff = np.vstack([self._diff, np.zeros((grow, self._days + 1))])
+            self._load = np.vstack([self._load, np.zeros((grow, self._days))])
+        self._diff[row, 0] += rate
+        self._diff[row, end] -= rate
+        self._dirty.add(row)
+
+    def load(self) -> np.ndarray:
+        if self._dirty:
+            rows = sorted(self._dirty)
+            self._load[rows] = _running_sum(self._diff[rows])
+            self._dirty.clear()
+        return self._load
+
+
+def _running_sum(diff: np.ndarray) -> np.ndarray:
+    load = np.cumsum(diff[:, :-1], axis=1)
+    load[np.abs(load) < _EPSILON] = 0.0
+    return load
+
+
+class CapacityPlan:
+    """Daily and weekly open-hours load per account and per status, over a working-day horizon"""
+
+    def __init__(self, tasks: Iterable[TaskRecord] = (), today: Optional[date] = None,
+                 horizon_days: int = HORIZON_DAYS, daily_capacity: float = DAILY_CAPACITY,
+                 calendar: Optional[np.busdaycalendar] = None):
+        self.horizon_days = horizon_days
+        self.daily_capacity = daily_capacity
+        self._calendar = calendar or np.busdaycalendar()
+        self._slots: Dict[str, int] = {}  # task id -> slot
+        self._free: List[int] = []
+        self._account_codes: Dict[str, int] = {}
+        self._account_ids: List[str] = []  # code -> account id
+        self._status_codes: Dict[str, int] = {status: code for code, status in enumerate(vocabulary.STATUSES)}
+        self._statuses: List[str] = list(vocabulary.STATUSES)
+        self._lock = threading.Lock()
+        tasks = list(tasks)
+        self._slots = {task.id: slot for slot, task in enumerate(tasks)}
+        self._account_column = np.array([self._account_code(task.account_id) for task in tasks], dtype=np.int32)
+        self._status_column = np.array([self._status_code(task.status) for task in tasks], dtype=np.int32)
+        self._deadline = np.array([task.deadline.toordinal() - _EPOCH for task in tasks], dtype=np.int64)
+        self._hours = np.array([float(task.estimated_hours) for task in tasks], dtype=np.float64)
+        self._open = np.array([task.status not in CLOSED_STATUSES for task in tasks], dtype=bool)
+        self._start(today or date.today())
+
+    @property
+    def today(self) -> date:
+        return self._today
+
+    @property
+    def days(self) -> List[date]:
+        """The working days of the horizon, one per daily column"""
+        return self._days.tolist()
+
+    def upsert(self, task: TaskRecord) -> None:
+        """Insert or re-spread a single task; only its old and new rows are re-summed"""
+        with self._lock:
+            slot = self._slots.get(task.id)
+            if slot is None:
+                slot = self._allocate(task.id)
+            else:
+                self._apply(slot, -1)
+            self._account_column[slot] = self._account_code(task.account_id)
+            self._status_column[slot] = self._status_code(task.status)
+            self._deadline[slot] = task.deadline.toordinal() - _EPOCH
+            self._hours[slot] = float(task.estimated_hours)
+            self._open[slot] = task.status not in CLOSED_STATUSES
+            one = slice(slot, slot + 1)
+            self._end[one], self._rate[one] = self._spread(self._deadline[one], self._hours[one], self._open[one])
+            self._apply(slot, 1)
+
+    def remove(self, task_id: str) -> None:
+        with self._lock:
+            slot = self._slots.pop(task_id, None)
+            if slot is None:
+                return
+            self._apply(slot, -1)
+            self._open[slot] = False
+            self._rate[slot] = 0.0
+            self._free.append(slot)
+
+    def advance(self, today: date) -> bool:
+        """Move the plan to start at ``today``; True if it was re-spread"""
+        with self._lock:
+            if today == self._today:
+                return False
+            self._start(today)
+            return True
+
+    def daily(self, by: str = 'account') -> Load:
+        """Hours per working day, one row per account (or status) in first-seen order"""
+        with self._lock:
+            return Load(list(self._keys(by)), self.days, self._rollup(by).load().copy())
+
+    def weekly(self, by: str = 'account') -> Load:
+        """Hours per calendar week, columns labelled with the week's Monday"""
+        with self._lock:
+            load = self._rollup(by).load()
+            keys = list(self._keys(by))
+            if not len(self._days):
+                return Load(keys, [], np.zeros((len(load), 0)))
+            day = self._days.astype(np.int64)
+            mondays = day - (day + 3) % 7  # day 0 of datetime64 was a Thursday
+            firsts = np.flatnonzero(np.diff(mondays, prepend=-1))
+            weekly = np.add.reduceat(load, firsts, axis=1) if len(load) else np.zeros((0, len(firsts)))
+            return Load(keys, mondays[firsts].astype('datetime64[D]').tolist(), weekly)
+
+    def overloads(self, daily_capacity: Optional[float] = None) -> List[Overload]:
+        """Runs of working days where an account's load is over capacity, largest excess first"""
+        capacity = self.daily_capacity if daily_capacity is None else daily_capacity
+        with self._lock:
+            load = self._rollup('account').load()
+            over = load > capacity + _EPSILON
+            if not over.any():
+                return []
+            edges = np.diff(np.pad(over.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+            # Both come out in row-major order, so the n-th start pairs with the n-th stop
+            rows, starts = np.nonzero(edges == 1)
+            _, stops = np.nonzero(edges == -1)
+            excess = np.cumsum(np.pad(np.maximum(load - capacity, 0.0), ((0, 0), (1, 0))), axis=1)
+            windows = [Overload(self._account_ids[row], self._days[start].item(), self._days[stop - 1].item(),
+                                int(stop - start), round(float(load[row, start:stop].max()), 2),
+                                round(float(excess[row, stop] - excess[row, start]), 2))
+                       for row, start, stop in zip(rows, starts, stops)]
+        return sorted(windows, key=lambda window: -window.excess_hours)
+
+    def _start(self, today: date) -> None:
+        """Lay out the horizon from ``today`` and re-spread every task over it"""
+        self._today = today
+        first = np.datetime64(today, 'D')
+        horizon = np.arange(first, first + self.horizon_days, dtype='datetime64[D]')
+        self._days = horizon[np.is_busday(horizon, busdaycal=self._calendar)]
+        self._end, self._rate = self._spread(self._deadline, self._hours, self._open)
+        self._account_rollup = _Rollup(len(self._days))
+        self._status_rollup = _Rollup(len(self._days))
+        self._account_rollup.rebuild(self._account_column, self._end, self._rate, len(self._account_ids))
+        self._status_rollup.rebuild(self._status_column, self._end, self._rate, len(self._statuses))
+
+    def _spread(self, deadline: np.ndarray, hours: np.ndarray, open_: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(column after the last working day, hours per working day) of each task"""
+        first = np.datetime64(self._today, 'D')
+        due = deadline.astype('datetime64[D]') + np.timedelta64(1, 'D')
+        # Working days from today through the deadline; overdue and due-today work all falls on the first day
+        working = np.maximum(np.busday_count(first, np.maximum(due, first), busdaycal=self._calendar), 1)
+        rate = np.where(open_, hours / working, 0.0)
+        return np.minimum(working, len(self._days)).astype(np.int64), rate
+
+    def _apply(self, slot: int, sign: int) -> None:
+        rate = self._rate[slot]
+        if rate:
+            end = int(self._end[slot])
+            self._account_rollup.add(int(self._account_column[slot]), end, sign * rate)
+            self._status_rollup.add(int(self._status_column[slot]), end, sign * rate)
+
+    def _rollup(self, by: str) -> _Rollup:
+        if by not in GROUPINGS:
+            raise ValueError(f"unknown grouping {by!r}, expected one of {GROUPINGS}")
+        return self._account_rollup if by == 'account' else self._status_rollup
+
+    def _keys(self, by: str) -> List[str]:
+        return self._account_ids if by == 'account' else self._statuses
+
+    def _allocate(self, task_id: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._hours)
+            size = max(16, slot * 2)
+            self._account_column = np.resize(self._account_column, size)
+            self._status_column = np.resize(self._status_column, size)
+            self._deadline = np.resize(self._deadline, size)
+            self._hours = np.resize(self._hours, size)
+            self._end = np.resize(self._end, size)
+            self._rate = np.resize(self._rate, size)
+            self._open = np.resize(self._open, size)
+            self._open[slot:] = False
+            self._rate[slot:] = 0.0
+            self._free.extend(range(size - 1, slot, -1))
+        self._slots[task_id] = slot
+        return slot
+
+    def _account_code(self, account_id: str) -> int:
+        code = self._account_codes.get(account_id)
+        if code is None:
+            code = self._account_codes[account_id] = len(self._account_ids)
+            self._account_ids.append(account_id)
+        return code
+
+    def _status_code(self, status: str) -> int:
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self._statuses)
+            self._statuses.append(status)
+        return code
@@ -0,0 +1,95 @@
+"""Task card HTML, built once per card state and shared by every session
+
+Cards are styled by one CSS block (``CARD_CSS``) sent once per rerun instead of
+inline styles on every card. ``CardCache`` memoizes the HTML per task, keyed on
+the task's version, its account name, priority bucket and days left, so an
+unchanged card costs a dict lookup.
+"""
+import threading
+from collections import OrderedDict
+from html import escape
+from typing import Hashable, Tuple
+
+import instrumentation
+import priority
+from task_store import TaskRecord
+
+CARD_CSS = """
+<style>
+.atm-card {
+    border: 1px solid #ddd;
+    border-radius: 8px;
+    padding: 12px;
+    margin: 8px;
+    height: 140px;
+    cursor: pointer;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    transition: transform 0.2s;
+}
+.atm-head { display: flex; justify-content: space-between; align-items: center; margin-bottom: 8px; }
+.atm-icon { font-size: 18px; }
+.atm-days { font-size: 12px; color: #666; }
+.atm-title { font-weight: bold; font-size: 14px; margin-bottom: 4px; line-height: 1.2; }
+.atm-account { font-size: 12px; color: #666; margin-bottom: 8px; }
+.atm-meta { font-size: 11px; color: #888; margin-bottom: 4px; }
+.atm-desc { font-size: 10px; color: #aaa; }
+""" + "".join(
+    f".atm-band-{band} {{ background-color: {color}; }}\n" for band, color in enumerate(priority.SCORE_COLORS)
+) + "</style>"
+
+# Background class per priority color
+_BAND_CLASSES = {color: f"atm-band-{band}" for band, color in enumerate(priority.SCORE_COLORS)}
+
+
+def build_card_html(task: TaskRecord, account_name: str, task_priority: priority.Priority) -> str:
+    """Card markup using the CARD_CSS classes; user text is escaped"""
+    title = escape(task.title[:30]) + ('...' if len(task.title) > 30 else '')
+    description = escape(task.description[:40]) + ('...' if len(task.description) > 40 else '')
+    status = task.status.replace('_', ' ').title()
+    return (
+        f'<div class="atm-card {_BAND_CLASSES[task_priority.color]}">'
+        f'<div class="atm-head"><span class="atm-icon">{task_priority.icon}</span>'
+        f'<span class="atm-days">{task_priority.days_left}d</span></div>'
+        f'<div class="atm-title">{title}</div>'
+        f'<div class="atm-account">{escape(account_name)}</div>'
+        f'<div class="atm-meta">{task.estimated_hours}h • {status}</div>'
+        f'<div class="atm-desc">{description}</div>'
+        f'</div>'
+    )
+
+
+class CardCache:
+    """Bounded LRU of rendered cards, one entry per task"""
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._cards: 'OrderedDict[str, Tuple[Hashable, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def render(self, task: TaskRecord, account_name: str, task_priority: priority.Priority) -> str:
+        key = (task.version, account_name, task_priority.label, task_priority.days_left)
+        with self._lock:
+            entry = self._cards.get(task.id)
+            if entry is not None and entry[0] == key:
+                self._cards.move_to_end(task.id)
+                self.hits += 1
+                instrumentation.count('cards.cached')
+                return entry[1]
+        html = build_card_html(task, account_name, task_priority)
+        instrumentation.count('cards.built')
+        with self._lock:
+            self.misses += 1
+            self._cards[task.id] = (key, html)
+            self._cards.move_to_end(task.id)
+            while len(self._cards) > self.max_entries:
+                self._cards.popitem(last=False)
+        return html
+
+    def evict(self, task_id: str) -> None:
+        with self._lock:
+            self._cards.pop(task_id, None)
@@ -0,0 +1,99 @@
+"""Sidebar dashboard metrics, computed in one pass and kept current incrementally
+
+``DashboardStats`` is built once from the task store and then adjusted by the
+add/remove deltas of every write, so the sidebar never rescans the board. Counts
+follow VW_DASHBOARD_STATS: a task is overdue when its deadline date has passed and
+it is not completed or cancelled.
+"""
+import bisect
+import threading
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+
+from task_store import AccountStore, TaskRecord, whole_hours
+
+CLOSED_STATUSES = ('completed', 'cancelled')
+
+
+class DashboardStats:
+    """Task counts and hour sums overall, per status, per account and per stage"""
+
+    def __init__(self, tasks: Iterable[TaskRecord] = ()):
+        self.task_count = 0
+        self.total_hours = 0.0
+        self.status_counts: Dict[str, int] = defaultdict(int)
+        self.status_hours: Dict[str, float] = defaultdict(float)
+        self.account_tasks: Dict[str, int] = defaultdict(int)
+        self.account_counts: Dict[Tuple[str, str], int] = defaultdict(int)  # (account_id, status) -> tasks
+        self.account_hours: Dict[str, float] = defaultdict(float)
+        self._open_deadlines: List[int] = []  # sorted deadline ordinals of open tasks
+        self._lock = threading.Lock()
+        for task in tasks:
+            self._apply(task, 1)
+            if task.status not in CLOSED_STATUSES:
+                self._open_deadlines.append(task.deadline.toordinal())
+        self._open_deadlines.sort()
+
+    def add(self, task: TaskRecord) -> None:
+        with self._lock:
+            self._apply(task, 1)
+            if task.status not in CLOSED_STATUSES:
+                bisect.insort(self._open_deadlines, task.deadline.toordinal())
+
+    def remove(self, task: TaskRecord) -> None:
+        with self._lock:
+            self._apply(task, -1)
+            if task.status not in CLOSED_STATUSES:
+                del self._open_deadlines[bisect.bisect_left(self._open_deadlines, task.deadline.toordinal())]
+
+    def overdue(self, today: date) -> int:
+        """Open tasks whose deadline date is before ``today``"""
+        return bisect.bisect_left(self._open_deadlines, today.toordinal())
+
+    def summary(self, today: date) -> Dict:
+        """Headline numbers for the sidebar"""
+        return {
+            'total_tasks': self.task_count,
+            'pending_tasks': self.status_counts['pending'],
+            'in_progress_tasks': self.status_counts['in_progress'],
+            'completed_tasks': self.status_counts['completed'],
+            'overdue_tasks': self.overdue(today),
+            'total_hours': whole_hours(self.total_hours),
+            'pending_hours': whole_hours(self.status_hours['pending']),
+            'in_progress_hours': whole_hours(self.status_hours['in_progress']),
+        }
+
+    def by_account(self, accounts: AccountStore) -> List[Dict]:
+        """One row per account with task counts by status and total hours"""
+        rows = []
+        for account in accounts:
+            counts = {status: self.account_counts[(account.id, status)] for status in ('pending', 'in_progress', 'completed')}
+            rows.append({
+                'account': account.name,
+                'stage': account.stage,
+                'tasks': self.account_tasks[account.id],
+                **counts,
+                'hours': whole_hours(self.account_hours[account.id]),
+            })
+        return rows
+
+    def by_stage(self, accounts: AccountStore) -> List[Dict]:
+        """Account rows rolled up by account stage (stages come from the live account records)"""
+        stages: Dict[str, Dict] = {}
+        for row in self.by_account(accounts):
+            totals = stages.setdefault(row['stage'], {'stage': row['stage'], 'accounts': 0, 'tasks': 0, 'hours': 0})
+            totals['accounts'] += 1
+            totals['tasks'] += row['tasks']
+            totals['hours'] = whole_hours(totals['hours'] + row['hours'])
+        return list(stages.values())
+
+    def _apply(self, task: TaskRecord, sign: int) -> None:
+        hours = task.estimated_hours * sign
+        self.task_count += sign
+        self.total_hours += hours
+        self.status_counts[task.status] += sign
+        self.status_hours[task.status] += hours
+        self.account_tasks[task.account_id] += sign
+        self.account_counts[(task.account_id, task.status)] += sign
+        self.account_hours[task.account_id] += hours
@@ -0,0 +1,186 @@
+"""Timing spans, counters and one-off profiling of Streamlit reruns
+
+Enabled with the ``ATM_INSTRUMENT`` environment variable. app.py brackets each
+script run with ``begin_rerun`` / ``end_rerun``; in between, ``span`` times a
+block (spans nest) and ``count`` bumps a named counter such as cache hits or
+rows scanned. Finished reruns go to a process-wide ring of the latest
+``HISTORY`` runs, shown by the sidebar overlay and by ``metrics_text`` in a
+Prometheus-style text dump. ``profile`` runs one rerun under cProfile.
+
+When disabled, ``span`` returns a shared no-op context manager, ``count`` returns
+at once and ``timed`` leaves the function undecorated.
+"""
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+ENABLED = os.environ.get('ATM_INSTRUMENT', '').lower() in ('1', 'true', 'yes', 'on')
+HISTORY = 50
+
+_NOOP = nullcontext()
+_local = threading.local()
+_history: Deque['Rerun'] = deque(maxlen=HISTORY)
+_totals: Counter = Counter()  # counters of every finished rerun, and of work outside reruns
+_lock = threading.Lock()
+
+
+class Span(NamedTuple):
+    name: str
+    depth: int
+    start_ms: float  # from the start of the rerun
+    duration_ms: float
+
+
+class Rerun:
+    """Spans and counters of one script run"""
+
+    __slots__ = ('session', 'started_at', 'duration_ms', 'spans', 'counters', '_start', '_depth')
+
+    def __init__(self, session: str):
+        self.session = session
+        self.started_at = datetime.now()
+        self.duration_ms = 0.0
+        self.spans: List[Span] = []  # in completion order; sort by start_ms for a timeline
+        self.counters: Counter = Counter()
+        self._start = time.perf_counter()
+        self._depth = 0
+
+    def timeline(self) -> List[Span]:
+        return sorted(self.spans, key=lambda span: span.start_ms)
+
+
+class _Span:
+    __slots__ = ('_rerun', '_name', '_start', '_depth')
+
+    def __init__(self, rerun: Rerun, name: str):
+        self._rerun = rerun
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._depth = self._rerun._depth
+        self._rerun._depth += 1
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter()
+        rerun = self._rerun
+        rerun._depth -= 1
+        rerun.spans.append(Span(self._name, self._depth, (self._start - rerun._start) * 1000,
+                                (end - self._start) * 1000))
+
+
+def begin_rerun(session: str) -> None:
+    if ENABLED:
+        _local.rerun = Rerun(session)
+
+
+def end_rerun() -> Optional[Rerun]:
+    """Close the current rerun and add it to the history"""
+    rerun = getattr(_local, 'rerun', None) if ENABLED else None
+    if rerun is None:
+        return None
+    _local.rerun = None
+    rerun.duration_ms = (time.perf_counter() - rerun._start) * 1000
+    rerun.counters['reruns'] += 1
+    with _lock:
+        _history.append(rerun)
+        _totals.update(rerun.counters)
+    return rerun
+
+
+def span(name: str):
+    """Context manager timing a block of the current rerun"""
+    if not ENABLED:
+        return _NOOP
+    rerun = getattr(_local, 'rerun', None)
+    return _NOOP if rerun is None else _Span(rerun, name)
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """Decorator form of ``span``"""
+    def decorate(fn: Callable) -> Callable:
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, n: int = 1) -> None:
+    if not ENABLED:
+        return
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        rerun.counters[name] += n
+    else:
+        with _lock:
+            _totals[name] += n
+
+
+def recent(n: int = HISTORY) -> List[Rerun]:
+    """The latest ``n`` finished reruns, newest first"""
+    with _lock:
+        return list(_history)[::-1][:n]
+
+
+def totals() -> Dict[str, int]:
+    with _lock:
+        return dict(_totals)
+
+
+def span_summary(reruns: List[Rerun]) -> List[Tuple[str, int, float, float]]:
+    """(span, calls, total ms, max ms) over the given reruns, slowest total first"""
+    calls: Counter = Counter()
+    total: Dict[str, float] = Counter()
+    slowest: Dict[str, float] = {}
+    for rerun in reruns:
+        for s in rerun.spans:
+            calls[s.name] += 1
+            total[s.name] += s.duration_ms
+            slowest[s.name] = max(slowest.get(s.name, 0.0), s.duration_ms)
+    return sorted(((name, calls[name], total[name], slowest[name]) for name in calls), key=lambda row: -row[2])
+
+
+def metrics_text() -> str:
+    """Prometheus-style text dump of the counters and of the spans in the rerun history"""
+    reruns = recent()
+    lines = ['# TYPE atm_counter_total counter']
+    lines += [f'atm_counter_total{{name="{name}"}} {value}' for name, value in sorted(totals().items())]
+    durations = sorted(rerun.duration_ms for rerun in reruns)
+    if durations:
+        lines.append('# TYPE atm_rerun_ms summary')
+        for q in (0.5, 0.9, 0.99):
+            lines.append(f'atm_rerun_ms{{quantile="{q}"}} {durations[min(len(durations) - 1, int(q * len(durations)))]:.3f}')
+        lines.append(f'atm_rerun_ms_count {len(durations)}')
+    lines.append('# TYPE atm_span_ms summary')
+    for name, calls, total, slowest in span_summary(reruns):
+        lines.append(f'atm_span_ms_sum{{span="{name}"}} {total:.3f}')
+        lines.append(f'atm_span_ms_count{{span="{name}"}} {calls}')
+        lines.append(f'atm_span_ms_max{{span="{name}"}} {slowest:.3f}')
+    return '\n'.join(lines) + '\n'
+
+
+def profile(fn: Callable[[], Any], save: Callable[[str], None], limit: int = 40) -> Any:
+    """Run ``fn`` under cProfile and pass the top ``limit`` functions by cumulative time to ``save``
+
+    The report is saved even when ``fn`` raises, since Streamlit reruns and stops are exceptions.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn)
+    finally:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        save(out.getvalue())
@@ -0,0 +1,792 @@
+"""Persistence backends for accounts and tasks
+
+The app reads and writes the board through a ``Backend``:
+
+- ``MemoryBackend`` keeps everything in one process-wide store (default)
+- ``SQLiteBackend`` mirrors the Snowflake schema from setup_tables.sql locally
+- ``SnowflakeBackend`` talks to TBL_ACCOUNTS / TBL_TASKS / VW_TASKS_WITH_ACCOUNTS
+
+Pick one with the ``ATM_BACKEND`` environment variable (memory, sqlite, snowflake).
+An empty memory or SQLite store is seeded from seed_data.json (or ``ATM_SEED_FILE``).
+
+Updates are compare-and-swap: a record's ``version`` is the version it is moving
+to, and the write only applies while the stored row is still one version behind
+(ROW_VERSION in SQL). ``update_*`` return the ids that failed that check.
+
+``load_changes`` is the delta read used to keep a loaded board current: the SQL
+backends return only rows whose UPDATED_AT is at or after a watermark, with
+IS_ACTIVE = FALSE rows as tombstones. The default reads everything and returns
+no watermark, which tells the caller to reload in full.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import cached_property
+from typing import Any, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import priority
+import vocabulary
+from task_store import whole_hours
+
+# Re-read rows this far behind the watermark, for writes whose UPDATED_AT was taken before they committed
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# Rows per compare-and-set statement, which binds every value of every row
+CAS_BATCH_ROWS = 500
+
+# Audit entries the memory backend keeps; older ones are dropped (the SQL backends keep everything)
+MEMORY_HISTORY_LIMIT = 10000
+
+# Sample board used to populate an empty store; ATM_SEED_FILE points at another fixture
+SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seed_data.json')
+
+
+def load_seed(path: Optional[str] = None) -> Tuple[List[Dict], List[Dict]]:
+    """(accounts, tasks) from a seed fixture; task deadlines are stored as days from now"""
+    with open(path or os.environ.get('ATM_SEED_FILE', SEED_PATH), encoding='utf-8') as f:
+        fixture = json.load(f)
+    now = datetime.now()
+    tasks = []
+    for task in fixture['tasks']:
+        task = dict(task)
+        task['deadline'] = now + timedelta(days=task.pop('deadline_in_days'))
+        task.setdefault('created_at', now)
+        tasks.append(task)
+    return fixture['accounts'], tasks
+
+
+class BoardDelta(NamedTuple):
+    accounts: List[Dict]  # active accounts added or changed since the watermark
+    tasks: List[Dict]
+    deleted_accounts: List[str]  # IS_ACTIVE = FALSE tombstones
+    deleted_tasks: List[str]
+    watermark: Optional[datetime]  # pass back as ``since`` on the next call; None if deltas are not supported
+
+
+class Backend:
+    """Interface shared by all persistence backends"""
+
+    # Identifies the stored data across processes (for on-disk board snapshots), down to the DATABASE_ID the
+    # tables were created with, so a recreated database never matches an old snapshot; None when process-local
+    source: Optional[str] = None
+
+    def load_board(self) -> Tuple[List[Dict], List[Dict]]:
+        """Return (accounts, tasks) for every active record"""
+        raise NotImplementedError
+
+    def load_changes(self, since: Optional[datetime] = None) -> BoardDelta:
+        """Records changed at or after ``since`` (everything active when None), plus the next watermark"""
+        accounts, tasks = self.load_board()
+        return BoardDelta(accounts, tasks, [], [], None)
+
+    def add_accounts(self, accounts: List[Dict]) -> None:
+        raise NotImplementedError
+
+    def update_accounts(self, accounts: List[Dict]) -> List[str]:
+        """Version-checked updates; returns the ids that were changed or deleted by someone else"""
+        raise NotImplementedError
+
+    def add_tasks(self, tasks: List[Dict]) -> None:
+        raise NotImplementedError
+
+    def update_tasks(self, tasks: List[Dict]) -> List[str]:
+        """Version-checked updates; returns the ids that were changed or deleted by someone else"""
+        raise NotImplementedError
+
+    def delete_tasks(self, task_ids: List[str]) -> None:
+        raise NotImplementedError
+
+    def insert_history(self, entries: List[Dict]) -> None:
+        """Append audit entries (see audit.py) to TBL_TASK_HISTORY; entries whose HISTORY_ID is stored are skipped"""
+        raise NotImplementedError
+
+    def refresh_priorities(self, today: Optional[date] = None) -> int:
+        """Re-score only tasks whose stored priority is out of date; returns the number of rows changed"""
+        raise NotImplementedError
+
+    def load_options(self) -> Dict[str, List[str]]:
+        """Option lists from the LKP_* tables, keyed like ``vocabulary.OPTION_LISTS``; empty where not stored"""
+        return {}
+
+    def add_account(self, account: Dict) -> None:
+        self.add_accounts([account])
+
+    def update_account(self, account: Dict) -> bool:
+        return not self.update_accounts([account])
+
+    def add_task(self, task: Dict) -> None:
+        self.add_tasks([task])
+
+    def update_task(self, task: Dict) -> bool:
+        return not self.update_tasks([task])
+
+    def delete_task(self, task_id: str) -> None:
+        self.delete_tasks([task_id])
+
+    def _seed(self, accounts: List[Dict], tasks: List[Dict]) -> None:
+        self.add_accounts(accounts)
+        self.add_tasks(tasks)
+
+
+class MemoryBackend(Backend):
+    """Process-wide in-memory store, shared by every session of the server"""
+
+    def __init__(self, seed: bool = True):
+        self._lock = threading.Lock()
+        self._accounts: Dict[str, Dict] = {}
+        self._tasks: Dict[str, Dict] = {}
+        self.history: Deque[Dict] = deque()  # the latest MEMORY_HISTORY_LIMIT audit entries, oldest first
+        self._history_ids: Set[str] = set()
+        if seed:
+            self._seed(*load_seed())
+
+    def load_board(self) -> Tuple[List[Dict], List[Dict]]:
+        with self._lock:
+            accounts = [_copy_account(a) for a in self._accounts.values()]
+            tasks = [dict(t) for t in self._tasks.values()]
+        return accounts, tasks
+
+    def add_accounts(self, accounts: List[Dict]) -> None:
+        with self._lock:
+            for account in accounts:
+                self._accounts[account['id']] = _copy_account(account)
+
+    def update_accounts(self, accounts: List[Dict]) -> List[str]:
+        stale = []
+        with self._lock:
+            for account in accounts:
+                stored = self._accounts.get(account['id'])
+                if stored is None or stored.get('version', 1) != account['version'] - 1:
+                    stale.append(account['id'])
+                else:
+                    stored.update(_copy_account(account))
+        return stale
+
+    def add_tasks(self, tasks: List[Dict]) -> None:
+        with self._lock:
+            for task in tasks:
+                self._tasks[task['id']] = _with_priority(task)
+
+    def update_tasks(self, tasks: List[Dict]) -> List[str]:
+        stale = []
+        with self._lock:
+            for task in tasks:
+                stored = self._tasks.get(task['id'])
+                if stored is None or stored.get('version', 1) != task['version'] - 1:
+                    stale.append(task['id'])
+                else:
+                    stored.update(_with_priority(task))
+        return stale
+
+    def delete_tasks(self, task_ids: List[str]) -> None:
+        with self._lock:
+            for task_id in task_ids:
+                self._tasks.pop(task_id, None)
+
+    def insert_history(self, entries: List[Dict]) -> None:
+        with self._lock:
+            for entry in entries:
+                if entry['history_id'] in self._history_ids:
+                    continue
+                self.history.append(dict(entry))
+                self._history_ids.add(entry['history_id'])
+                if len(self.history) > MEMORY_HISTORY_LIMIT:
+                    self._history_ids.discard(self.history.popleft()['history_id'])
+
+    def refresh_priorities(self, today: Optional[date] = None) -> int:
+        today = today or date.today()
+        changed = 0
+        with self._lock:
+            for task in self._tasks.values():
+                score, label = priority.stored_priority(task['deadline'], task['estimated_hours'], today)
+                if (task.get('priority_score'), task.get('priority_label')) != (score, label):
+                    task.update(priority_score=score, priority_label=label)
+                    changed += 1
+        return changed
+
+
+class ConnectionPool:
+    """Small thread-safe pool that hands out DB-API connections and reuses them"""
+
+    def __init__(self, connect: Callable[[], Any], max_idle: int = 4):
+        self._connect = connect
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=max_idle)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection; commits on success and rolls back on error"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                conn.close()
+                raise
+            self._release(conn)
+            raise
+        else:
+            self._release(conn)
+
+    def _release(self, conn: Any) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SQLBackend(Backend):
+    """Backend over the TBL_ACCOUNTS / TBL_TASKS schema; writes are batched with executemany"""
+
+    # Placeholder used to bind the TECH_STACK array as a JSON string
+    json_param = '?'
+    # The database clock, in the form UPDATED_AT defaults to
+    clock_sql = "SELECT CURRENT_TIMESTAMP"
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+
+    def load_board(self) -> Tuple[List[Dict], List[Dict]]:
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT ACCOUNT_ID, ACCOUNT_NAME, ACCOUNT_STAGE, ACCOUNT_PHASE, TECH_STACK, ROW_VERSION "
+                "FROM TBL_ACCOUNTS WHERE IS_ACTIVE = TRUE ORDER BY CREATED_AT, ACCOUNT_ID"
+            )
+            accounts = [_account_from_row(row) for row in cur.fetchall()]
+            cur.execute(
+                "SELECT TASK_ID, ACCOUNT_ID, ACCOUNT_NAME, TASK_TITLE, TASK_DESCRIPTION, ESTIMATED_HOURS, "
+                "DEADLINE_DATE, TASK_STATUS, CREATED_AT, ROW_VERSION FROM VW_TASKS_WITH_ACCOUNTS "
+                "ORDER BY CREATED_AT, TASK_ID"
+            )
+            tasks = [_task_from_row(row) for row in cur.fetchall()]
+        return accounts, tasks
+
+    def load_changes(self, since: Optional[datetime] = None) -> BoardDelta:
+        # The watermark is the database clock read first, so a row written while the deltas are read is fetched
+        # again next time
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(self.clock_sql)
+            watermark = _to_datetime(cur.fetchone()[0])
+            if since is None:
+                accounts, tasks = self.load_board()
+                return BoardDelta(accounts, tasks, [], [], watermark)
+            after = _timestamp((since - SYNC_OVERLAP).replace(microsecond=0))
+            cur.execute(
+                "SELECT ACCOUNT_ID, ACCOUNT_NAME, ACCOUNT_STAGE, ACCOUNT_PHASE, TECH_STACK, ROW_VERSION, IS_ACTIVE "
+                "FROM TBL_ACCOUNTS WHERE UPDATED_AT >= ? ORDER BY CREATED_AT, ACCOUNT_ID", (after,)
+            )
+            account_rows = cur.fetchall()
+            # Like VW_TASKS_WITH_ACCOUNTS, but keeping inactive rows as tombstones
+            cur.execute(
+                "SELECT t.TASK_ID, t.ACCOUNT_ID, a.ACCOUNT_NAME, t.TASK_TITLE, t.TASK_DESCRIPTION, t.ESTIMATED_HOURS, "
+                "t.DEADLINE_DATE, t.TASK_STATUS, t.CREATED_AT, t.ROW_VERSION, t.IS_ACTIVE AND a.IS_ACTIVE "
+                "FROM TBL_TASKS t JOIN TBL_ACCOUNTS a ON a.ACCOUNT_ID = t.ACCOUNT_ID "
+                "WHERE t.UPDATED_AT >= ? ORDER BY t.CREATED_AT, t.TASK_ID", (after,)
+            )
+            task_rows = cur.fetchall()
+        return BoardDelta(
+            [_account_from_row(row[:-1]) for row in account_rows if row[-1]],
+            [_task_from_row(row[:-1]) for row in task_rows if row[-1]],
+            [row[0] for row in account_rows if not row[-1]],
+            [row[0] for row in task_rows if not row[-1]],
+            watermark,
+        )
+
+    def database_id(self) -> Optional[str]:
+        """DATABASE_ID from TBL_APP_METADATA; None for tables set up before it was added"""
+        try:
+            with self.pool.connection() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT META_VALUE FROM TBL_APP_METADATA WHERE META_KEY = 'DATABASE_ID'")
+                row = cur.fetchone()
+        except Exception:
+            return None
+        return row[0] if row else None
+
+    def load_options(self) -> Dict[str, List[str]]:
+        # One round trip for all three lookups; read once per process by the app
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT 'stages', STAGE_CODE, STAGE_NAME, SORT_ORDER FROM LKP_ACCOUNT_STAGES WHERE IS_ACTIVE = TRUE "
+                "UNION ALL SELECT 'phases', PHASE_CODE, PHASE_NAME, SORT_ORDER FROM LKP_ACCOUNT_PHASES WHERE IS_ACTIVE = TRUE "
+                "UNION ALL SELECT 'tech_stack', TECH_CODE, TECH_NAME, 0 FROM LKP_TECH_STACK WHERE IS_ACTIVE = TRUE "
+                "ORDER BY 1, 4, 2"
+            )
+            rows = cur.fetchall()
+        options: Dict[str, List[str]] = {}
+        for key, code, name, _ in rows:
+            options.setdefault(key, []).append(vocabulary.option_name(code, name, vocabulary.OPTION_LISTS[key]))
+        return options
+
+    def add_accounts(self, accounts: List[Dict]) -> None:
+        self._executemany(
+            "INSERT INTO TBL_ACCOUNTS (ACCOUNT_ID, ACCOUNT_NAME, ACCOUNT_STAGE, ACCOUNT_PHASE, TECH_STACK) "
+            f"SELECT ?, ?, ?, ?, {self.json_param}",
+            [(a['id'],) + _account_params(a) for a in accounts]
+        )
+
+    def update_accounts(self, accounts: List[Dict]) -> List[str]:
+        return self._compare_and_set(
+            'TBL_ACCOUNTS', 'ACCOUNT_ID', ['ACCOUNT_NAME', 'ACCOUNT_STAGE', 'ACCOUNT_PHASE', 'TECH_STACK'],
+            [(a['id'], a['version']) + _account_params(a) for a in accounts], json_columns=('TECH_STACK',)
+        )
+
+    def add_tasks(self, tasks: List[Dict]) -> None:
+        self._executemany(
+            "INSERT INTO TBL_TASKS (TASK_ID, ACCOUNT_ID, TASK_TITLE, TASK_DESCRIPTION, ESTIMATED_HOURS, "
+            "DEADLINE_DATE, TASK_STATUS, PRIORITY_SCORE, PRIORITY_LABEL, CREATED_AT) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(t['id'],) + _task_params(t) + (_timestamp(t.get('created_at') or datetime.now()),) for t in tasks]
+        )
+
+    def update_tasks(self, tasks: List[Dict]) -> List[str]:
+        return self._compare_and_set(
+            'TBL_TASKS', 'TASK_ID',
+            ['ACCOUNT_ID', 'TASK_TITLE', 'TASK_DESCRIPTION', 'ESTIMATED_HOURS', 'DEADLINE_DATE', 'TASK_STATUS',
+             'PRIORITY_SCORE', 'PRIORITY_LABEL'],
+            [(t['id'], t['version']) + _task_params(t) for t in tasks]
+        )
+
+    def delete_tasks(self, task_ids: List[str]) -> None:
+        # Soft delete so TBL_TASK_HISTORY rows keep a valid TASK_ID
+        self._executemany(
+            "UPDATE TBL_TASKS SET IS_ACTIVE = FALSE, UPDATED_AT = CURRENT_TIMESTAMP WHERE TASK_ID = ?",
+            [(task_id,) for task_id in task_ids]
+        )
+
+    def insert_history(self, entries: List[Dict]) -> None:
+        # CHANGED_BY is left to its column default (the connection's user). A batch replayed after a crash
+        # between the insert and the spool cleanup is skipped row by row; Snowflake does not enforce the key
+        self._executemany(
+            "INSERT INTO TBL_TASK_HISTORY (HISTORY_ID, TASK_ID, CHANGE_TYPE, OLD_VALUES, NEW_VALUES, CHANGED_AT) "
+            f"SELECT ?, ?, ?, {self.json_param}, {self.json_param}, ? "
+            "WHERE NOT EXISTS (SELECT 1 FROM TBL_TASK_HISTORY WHERE HISTORY_ID = ?)",
+            [(e['history_id'], e['task_id'], e['change_type'], _json_or_null(e['old_values']),
+              _json_or_null(e['new_values']), e['changed_at'], e['history_id']) for e in entries]
+        )
+
+    def _compare_and_set(self, table: str, key: str, columns: List[str], rows: List[Tuple],
+                         json_columns: Tuple[str, ...] = ()) -> List[str]:
+        """Version-checked update of (id, new version, values of ``columns``...) rows; returns the ids it did not apply to
+
+        Each chunk of rows is one UPDATE joined to a VALUES list on the id and the previous ROW_VERSION. Only
+        when it changes fewer rows than it was sent does one more read, joined to the same list, pick out the
+        ids whose stored row does not hold this write: gone, at another version, or moved to the same
+        version by another writer with other values.
+        """
+        stale = []
+        if not rows:
+            return stale
+        values = [(column, f'v.column{i}') for i, column in enumerate(columns, start=3)]
+        values = [(column, self.json_param.replace('?', value) if column in json_columns else value)
+                  for column, value in values]
+        assignments = ', '.join(f"{column} = {value}" for column, value in values)
+        written = ' AND '.join(f"t.{column} = {value}" for column, value in values)
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            for start in range(0, len(rows), CAS_BATCH_ROWS):
+                chunk = rows[start:start + CAS_BATCH_ROWS]
+                placeholders = '(' + ', '.join('?' * len(chunk[0])) + ')'
+                params = [value for row in chunk for value in row]
+                cur.execute(
+                    f"UPDATE {table} AS t SET {assignments}, ROW_VERSION = v.column2, UPDATED_AT = CURRENT_TIMESTAMP "
+                    f"FROM (VALUES {', '.join([placeholders] * len(chunk))}) AS v "
+                    f"WHERE t.{key} = v.column1 AND t.ROW_VERSION = v.column2 - 1 AND t.IS_ACTIVE = TRUE",
+                    params
+                )
+                if cur.rowcount >= len(chunk):
+                    continue
+                cur.execute(
+                    f"SELECT v.column1 FROM (VALUES {', '.join([placeholders] * len(chunk))}) AS v "
+                    f"LEFT JOIN {table} AS t ON t.{key} = v.column1 AND t.ROW_VERSION = v.column2 "
+                    f"AND t.IS_ACTIVE = TRUE AND {written} WHERE t.{key} IS NULL",
+                    params
+                )
+                stale.extend(record_id for record_id, in cur.fetchall())
+        return stale
+
+    def _executemany(self, sql: str, params: List[Tuple]) -> None:
+        if not params:
+            return
+        with self.pool.connection() as conn:
+            conn.cursor().executemany(sql, params)
+
+
+class SQLiteBackend(SQLBackend):
+    """Local SQLite mirror of the Snowflake schema, for development and benchmarks"""
+
+    def __init__(self, path: str = 'account_tasks.db', seed: bool = True, max_idle: int = 4):
+        if path == ':memory:':
+            # Named shared-cache database so every pooled connection sees the same data
+            path, uri = f'file:atm_{uuid.uuid4().hex}?mode=memory&cache=shared', True
+        else:
+            uri = path.startswith('file:')
+        self._path, self._uri = path, uri
+        super().__init__(ConnectionPool(self._connect, max_idle=max_idle))
+        # Keeps in-memory databases alive for the lifetime of the backend
+        self._keepalive = self._connect()
+        self._migrate()
+        self._keepalive.executescript(SQLITE_SCHEMA)
+        self.source = None if uri else f'sqlite:{os.path.abspath(path)}:{self.database_id()}'
+        # The fixture is only read for a fresh database
+        if seed and self._keepalive.execute("SELECT COUNT(*) FROM TBL_ACCOUNTS").fetchone()[0] == 0:
+            self._seed(*load_seed())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._path, uri=self._uri, check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def _migrate(self) -> None:
+        """Add columns introduced after a local database file was created"""
+        for table in ('TBL_ACCOUNTS', 'TBL_TASKS'):
+            columns = {row[1] for row in self._keepalive.execute(f"PRAGMA table_info({table})")}
+            if columns and 'ROW_VERSION' not in columns:
+                self._keepalive.execute(f"ALTER TABLE {table} ADD COLUMN ROW_VERSION INTEGER NOT NULL DEFAULT 1")
+        self._keepalive.commit()
+
+    def refresh_priorities(self, today: Optional[date] = None) -> int:
+        # Local stand-in for CALL SP_UPDATE_TASK_PRIORITIES()
+        with self.pool.connection() as conn:
+            return conn.execute(SQLITE_REFRESH_PRIORITIES, ((today or date.today()).isoformat(),)).rowcount
+
+
+class SnowflakeBackend(SQLBackend):
+    """Backend over the objects created by setup_tables.sql"""
+
+    json_param = 'PARSE_JSON(?)'
+    clock_sql = "SELECT CURRENT_TIMESTAMP()::TIMESTAMP_NTZ"
+
+    def __init__(self, connection_name: str = None, max_idle: int = 4):
+        self._connection_name = connection_name
+        super().__init__(ConnectionPool(self._connect, max_idle=max_idle))
+
+    @cached_property
+    def source(self) -> Optional[str]:
+        # Read on first use, so building the backend does not connect
+        database_id = self.database_id()
+        return f'snowflake:{self._connection_name or "default"}:{database_id}' if database_id else None
+
+    def _connect(self) -> Any:
+        import snowflake.connector
+
+        kwargs = {'paramstyle': 'qmark'}
+        if self._connection_name:
+            kwargs['connection_name'] = self._connection_name
+        return snowflake.connector.connect(**kwargs)
+
+    def refresh_priorities(self, today: Optional[date] = None) -> int:
+        # The procedure scores against CURRENT_DATE(); ``today`` only applies to the local backends
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("CALL SP_UPDATE_TASK_PRIORITIES()")
+            return int(cur.fetchone()[0])
+
+
+def create_backend(name: str = None) -> Backend:
+    """Build the backend selected by ``name`` or the ATM_BACKEND environment variable"""
+    name = (name or os.environ.get('ATM_BACKEND', 'memory')).lower()
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'sqlite':
+        return SQLiteBackend(os.environ.get('ATM_SQLITE_PATH', 'account_tasks.db'))
+    if name == 'snowflake':
+        return SnowflakeBackend(os.environ.get('ATM_SNOWFLAKE_CONNECTION'))
+    raise ValueError(f"Unknown backend '{name}' (expected memory, sqlite or snowflake)")
+
+
+def _copy_account(account: Dict) -> Dict:
+    return dict(account, tech_stack=list(account['tech_stack']))
+
+
+def _account_params(account: Dict) -> Tuple:
+    return (
+        account['name'],
+        vocabulary.to_code(account['stage']),
+        vocabulary.to_code(account['phase']),
+        json.dumps([vocabulary.to_code(t) for t in account['tech_stack']]),
+    )
+
+
+def _task_params(task: Dict) -> Tuple:
+    # The priority is stored as of today; SP_UPDATE_TASK_PRIORITIES only revisits the row when its bucket moves
+    return (
+        task['account_id'],
+        task['title'],
+        task['description'],
+        task['estimated_hours'],
+        _to_date(task['deadline']).isoformat(),
+        vocabulary.to_code(task['status']),
+    ) + priority.stored_priority(task['deadline'], task['estimated_hours'], date.today())
+
+
+def _with_priority(task: Dict) -> Dict:
+    score, label = priority.stored_priority(task['deadline'], task['estimated_hours'], date.today())
+    return dict(task, priority_score=score, priority_label=label)
+
+
+def _account_from_row(row: Tuple) -> Dict:
+    account_id, name, stage, phase, tech_stack, version = row
+    return {
+        'id': account_id,
+        'name': name,
+        'stage': vocabulary.from_code(stage, vocabulary.STAGES),
+        'phase': vocabulary.from_code(phase, vocabulary.PHASES),
+        'tech_stack': [vocabulary.from_code(t, vocabulary.TECH_STACK) for t in json.loads(tech_stack or '[]')],
+        'version': int(version)
+    }
+
+
+def _task_from_row(row: Tuple) -> Dict:
+    task_id, account_id, account_name, title, description, hours, deadline, status, created_at, version = row
+    return {
+        'id': task_id,
+        'account_id': account_id,
+        'account_name': account_name,
+        'title': title,
+        'description': description or '',
+        'estimated_hours': whole_hours(hours),  # NUMBER(10,2) comes back as Decimal/float
+        'deadline': datetime.combine(_to_date(deadline), datetime.min.time()),
+        'status': vocabulary.from_code(status, vocabulary.STATUSES),
+        'created_at': _to_datetime(created_at),
+        'version': int(version)
+    }
+
+
+def _to_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _to_datetime(value: Any) -> datetime:
+    if value is None:
+        return datetime.now()
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def _timestamp(value: datetime) -> str:
+    return value.isoformat(sep=' ')
+
+
+def _json_or_null(value: Any) -> Any:
+    return None if value is None else json.dumps(value)
+
+
+# SQLite translation of the incremental UPDATE in SP_UPDATE_TASK_PRIORITIES; binds today's date
+SQLITE_REFRESH_PRIORITIES = """
+UPDATE TBL_TASKS AS t
+SET PRIORITY_SCORE = p.SCORE, PRIORITY_LABEL = p.LABEL, UPDATED_AT = CURRENT_TIMESTAMP
+FROM (
+    SELECT
+        TASK_ID,
+        CASE
+            WHEN DAYS_LEFT < 0 THEN 1000 + ESTIMATED_HOURS
+            WHEN DAYS_LEFT <= 3 THEN 900 - ESTIMATED_HOURS
+            WHEN DAYS_LEFT <= 7 THEN 800 - ESTIMATED_HOURS
+            WHEN DAYS_LEFT <= 30 THEN 600 - ESTIMATED_HOURS
+            ELSE 400 - ESTIMATED_HOURS
+        END AS SCORE,
+        CASE
+            WHEN DAYS_LEFT < 0 THEN 'CRITICAL'
+            WHEN DAYS_LEFT <= 3 THEN 'URGENT'
+            WHEN DAYS_LEFT <= 7 THEN 'HIGH'
+            WHEN DAYS_LEFT <= 30 THEN 'MEDIUM'
+            ELSE 'LOW'
+        END AS LABEL
+    FROM (
+        SELECT TASK_ID, ESTIMATED_HOURS, CAST(julianday(DEADLINE_DATE) - julianday(?1) AS INTEGER) AS DAYS_LEFT
+        FROM TBL_TASKS
+        WHERE IS_ACTIVE = TRUE
+    )
+) AS p
+WHERE t.TASK_ID = p.TASK_ID
+  AND (t.PRIORITY_SCORE IS NOT p.SCORE OR t.PRIORITY_LABEL IS NOT p.LABEL)
+"""
+
+# SQLite translation of setup_tables.sql (tables, lookups and the app-facing views)
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS TBL_ACCOUNTS (
+    ACCOUNT_ID VARCHAR(50) PRIMARY KEY,
+    ACCOUNT_NAME VARCHAR(200) NOT NULL,
+    ACCOUNT_STAGE VARCHAR(50) NOT NULL,
+    ACCOUNT_PHASE VARCHAR(50) NOT NULL,
+    TECH_STACK TEXT,
+    CREATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UPDATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CREATED_BY VARCHAR(100),
+    UPDATED_BY VARCHAR(100),
+    IS_ACTIVE BOOLEAN DEFAULT TRUE,
+    ROW_VERSION INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS TBL_TASKS (
+    TASK_ID VARCHAR(50) PRIMARY KEY,
+    ACCOUNT_ID VARCHAR(50) NOT NULL,
+    TASK_TITLE VARCHAR(500) NOT NULL,
+    TASK_DESCRIPTION TEXT,
+    ESTIMATED_HOURS NUMERIC(10,2) NOT NULL DEFAULT 1,
+    DEADLINE_DATE DATE NOT NULL,
+    TASK_STATUS VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    PRIORITY_SCORE NUMERIC(10,2),
+    PRIORITY_LABEL VARCHAR(20),
+    ACTUAL_HOURS NUMERIC(10,2),
+    COMPLETION_DATE TIMESTAMP,
+    CREATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UPDATED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CREATED_BY VARCHAR(100),
+    UPDATED_BY VARCHAR(100),
+    IS_ACTIVE BOOLEAN DEFAULT TRUE,
+    ROW_VERSION INTEGER NOT NULL DEFAULT 1,
+    CONSTRAINT FK_TASKS_ACCOUNT FOREIGN KEY (ACCOUNT_ID) REFERENCES TBL_ACCOUNTS(ACCOUNT_ID)
+);
+
+CREATE INDEX IF NOT EXISTS IX_TASKS_ACCOUNT ON TBL_TASKS (ACCOUNT_ID);
+CREATE INDEX IF NOT EXISTS IX_TASKS_UPDATED ON TBL_TASKS (UPDATED_AT);
+
+CREATE TABLE IF NOT EXISTS TBL_TASK_HISTORY (
+    HISTORY_ID VARCHAR(50) PRIMARY KEY,
+    TASK_ID VARCHAR(50) NOT NULL,
+    CHANGE_TYPE VARCHAR(20) NOT NULL,
+    OLD_VALUES TEXT,
+    NEW_VALUES TEXT,
+    CHANGED_BY VARCHAR(100),
+    CHANGED_AT TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT FK_TASK_HISTORY FOREIGN KEY (TASK_ID) REFERENCES TBL_TASKS(TASK_ID)
+);
+
+CREATE TABLE IF NOT EXISTS TBL_APP_METADATA (
+    META_KEY VARCHAR(50) PRIMARY KEY,
+    META_VALUE VARCHAR(500) NOT NULL
+);
+
+INSERT OR IGNORE INTO TBL_APP_METADATA (META_KEY, META_VALUE) VALUES ('DATABASE_ID', lower(hex(randomblob(16))));
+
+CREATE TABLE IF NOT EXISTS LKP_ACCOUNT_STAGES (
+    STAGE_CODE VARCHAR(20) PRIMARY KEY,
+    STAGE_NAME VARCHAR(100) NOT NULL,
+    STAGE_DESCRIPTION VARCHAR(500),
+    SORT_ORDER NUMERIC(3),
+    IS_ACTIVE BOOLEAN DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS LKP_ACCOUNT_PHASES (
+    PHASE_CODE VARCHAR(20) PRIMARY KEY,
+    PHASE_NAME VARCHAR(100) NOT NULL,
+    PHASE_DESCRIPTION VARCHAR(500),
+    SORT_ORDER NUMERIC(3),
+    IS_ACTIVE BOOLEAN DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS LKP_TECH_STACK (
+    TECH_CODE VARCHAR(50) PRIMARY KEY,
+    TECH_NAME VARCHAR(100) NOT NULL,
+    TECH_CATEGORY VARCHAR(50),
+    TECH_DESCRIPTION VARCHAR(500),
+    IS_ACTIVE BOOLEAN DEFAULT TRUE
+);
+
+INSERT OR IGNORE INTO LKP_ACCOUNT_STAGES (STAGE_CODE, STAGE_NAME, STAGE_DESCRIPTION, SORT_ORDER) VALUES
+('LEAD', 'Lead', 'Initial contact or inquiry from potential client', 1),
+('PROSPECT', 'Prospect', 'Qualified lead with identified opportunity', 2),
+('CUSTOMER', 'Customer', 'Active paying client with ongoing relationship', 3),
+('PARTNER', 'Partner', 'Strategic partnership or alliance', 4);
+
+INSERT OR IGNORE INTO LKP_ACCOUNT_PHASES (PHASE_CODE, PHASE_NAME, PHASE_DESCRIPTION, SORT_ORDER) VALUES
+('DISCOVERY', 'Discovery', 'Initial discovery and needs assessment phase', 1),
+('QUALIFICATION', 'Qualification', 'Qualifying opportunity and solution fit', 2),
+('JOURNEY', 'Journey', 'Active engagement and solution development', 3),
+('IMPLEMENTATION', 'Implementation', 'Solution implementation and deployment', 4),
+('SUPPORT', 'Support', 'Ongoing support and maintenance phase', 5);
+
+INSERT OR IGNORE INTO LKP_TECH_STACK (TECH_CODE, TECH_NAME, TECH_CATEGORY) VALUES
+('PYTHON', 'Python', 'Backend'),
+('STREAMLIT', 'Streamlit', 'Frontend'),
+('REACT', 'React', 'Frontend'),
+('NODEJS', 'Node.js', 'Backend'),
+('REDIS', 'Redis', 'Database'),
+('DOCKER', 'Docker', 'DevOps'),
+('POSTGRESQL', 'PostgreSQL', 'Database'),
+('MONGODB', 'MongoDB', 'Database'),
+('AWS', 'Amazon Web Services', 'Cloud'),
+('AZURE', 'Microsoft Azure', 'Cloud'),
+('SNOWFLAKE', 'Snowflake', 'Data Platform'),
+('JAVASCRIPT', 'JavaScript', 'Frontend'),
+('TYPESCRIPT', 'TypeScript', 'Frontend'),
+('FASTAPI', 'FastAPI', 'Backend'),
+('DJANGO', 'Django', 'Backend');
+
+DROP VIEW IF EXISTS VW_TASKS_WITH_ACCOUNTS;
+CREATE VIEW VW_TASKS_WITH_ACCOUNTS AS
+SELECT
+    t.TASK_ID,
+    t.ACCOUNT_ID,
+    a.ACCOUNT_NAME,
+    a.ACCOUNT_STAGE,
+    a.ACCOUNT_PHASE,
+    a.TECH_STACK,
+    t.TASK_TITLE,
+    t.TASK_DESCRIPTION,
+    t.ESTIMATED_HOURS,
+    t.DEADLINE_DATE,
+    t.TASK_STATUS,
+    t.PRIORITY_SCORE,
+    t.PRIORITY_LABEL,
+    t.ACTUAL_HOURS,
+    t.COMPLETION_DATE,
+    t.CREATED_AT,
+    t.UPDATED_AT,
+    t.ROW_VERSION,
+    CAST(julianday(t.DEADLINE_DATE) - julianday(date('now', 'localtime')) AS INTEGER) AS DAYS_UNTIL_DEADLINE,
+    CASE
+        WHEN t.DEADLINE_DATE < date('now', 'localtime') THEN 'OVERDUE'
+        WHEN julianday(t.DEADLINE_DATE) - julianday(date('now', 'localtime')) <= 3 THEN 'URGENT'
+        WHEN julianday(t.DEADLINE_DATE) - julianday(date('now', 'localtime')) <= 7 THEN 'HIGH'
+        WHEN julianday(t.DEADLINE_DATE) - julianday(date('now', 'localtime')) <= 30 THEN 'MEDIUM'
+        ELSE 'LOW'
+    END AS URGENCY_CATEGORY
+FROM TBL_TASKS t
+INNER JOIN TBL_ACCOUNTS a ON t.ACCOUNT_ID = a.ACCOUNT_ID
+WHERE t.IS_ACTIVE = TRUE AND a.IS_ACTIVE = TRUE;
+
+CREATE VIEW IF NOT EXISTS VW_DASHBOARD_STATS AS
+SELECT
+    COUNT(DISTINCT a.ACCOUNT_ID) AS TOTAL_ACCOUNTS,
+    COUNT(DISTINCT CASE WHEN a.ACCOUNT_STAGE = 'CUSTOMER' THEN a.ACCOUNT_ID END) AS ACTIVE_CUSTOMERS,
+    COUNT(t.TASK_ID) AS TOTAL_TASKS,
+    COUNT(CASE WHEN t.TASK_STATUS = 'PENDING' THEN 1 END) AS PENDING_TASKS,
+    COUNT(CASE WHEN t.TASK_STATUS = 'IN_PROGRESS' THEN 1 END) AS IN_PROGRESS_TASKS,
+    COUNT(CASE WHEN t.TASK_STATUS = 'COMPLETED' THEN 1 END) AS COMPLETED_TASKS,
+    COUNT(CASE WHEN t.DEADLINE_DATE < date('now', 'localtime') AND t.TASK_STATUS NOT IN ('COMPLETED', 'CANCELLED') THEN 1 END) AS OVERDUE_TASKS,
+    AVG(t.ESTIMATED_HOURS) AS AVG_TASK_HOURS,
+    SUM(CASE WHEN t.TASK_STATUS = 'PENDING' THEN t.ESTIMATED_HOURS ELSE 0 END) AS PENDING_HOURS,
+    SUM(CASE WHEN t.TASK_STATUS = 'IN_PROGRESS' THEN t.ESTIMATED_HOURS ELSE 0 END) AS IN_PROGRESS_HOURS
+FROM TBL_ACCOUNTS a
+LEFT JOIN TBL_TASKS t ON a.ACCOUNT_ID = t.ACCOUNT_ID AND t.IS_ACTIVE = TRUE
+WHERE a.IS_ACTIVE = TRUE;
+"""
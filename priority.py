@@ -0,0 +1,73 @@
+"""Priority scoring shared by the board, the sidebar and the SQL refresh
+
+Scores follow SP_UPDATE_TASK_PRIORITIES: the bucket is picked from whole days
+between a single reference date and the deadline date, then effort hours are
+added (overdue) or subtracted (everything else) from the bucket base.
+``score_tasks`` does this for a whole board in one vectorized pass.
+"""
+import bisect
+from datetime import date, datetime
+from typing import NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from task_store import DEADLINE_BUCKETS, TaskRecord
+
+# Upper inclusive bound of days left for every bucket but the last
+BUCKET_LIMITS = [high for _, high in list(DEADLINE_BUCKETS.values())[:-1]]
+BUCKET_BASES = [1000, 900, 800, 600, 400]
+BUCKET_SIGNS = [1, -1, -1, -1, -1]
+BUCKET_LABELS = ['CRITICAL', 'URGENT', 'HIGH', 'MEDIUM', 'LOW']
+
+# Icon/color thresholds on the score itself (lower bound of each band)
+SCORE_LIMITS = [400, 600, 800, 900]
+SCORE_ICONS = ["⚪", "🔵", "🟡", "🟠", "🔴"]
+SCORE_COLORS = ["#f5f5f5", "#e3f2fd", "#fffde7", "#fff3e0", "#ffebee"]
+
+
+class Priority(NamedTuple):
+    score: float
+    days_left: int
+    label: str
+    icon: str
+    color: str
+
+
+class ScoredTasks:
+    """Columnar priorities for a list of tasks, aligned with the input order"""
+
+    def __init__(self, days_left: np.ndarray, scores: np.ndarray, buckets: np.ndarray, bands: np.ndarray):
+        self.days_left = days_left
+        self.scores = scores
+        self.buckets = buckets
+        self.bands = bands
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+
+def score_tasks(tasks: Sequence[TaskRecord], today: date) -> ScoredTasks:
+    """Score every task against the same reference date"""
+    n = len(tasks)
+    deadlines = np.fromiter((t.deadline.toordinal() for t in tasks), dtype=np.int64, count=n)
+    hours = np.fromiter((t.estimated_hours for t in tasks), dtype=np.float64, count=n)
+    return score_columns(deadlines, hours, today)
+
+
+def score_columns(deadline_ordinals: np.ndarray, hours: np.ndarray, today: date) -> ScoredTasks:
+    """Vectorized scoring over deadline ordinals (date.toordinal()) and estimated hours"""
+    days_left = deadline_ordinals - today.toordinal()
+    buckets = np.searchsorted(BUCKET_LIMITS, days_left, side='left')
+    scores = np.take(BUCKET_BASES, buckets) + np.take(BUCKET_SIGNS, buckets) * hours
+    bands = np.searchsorted(SCORE_LIMITS, scores, side='right')
+    return ScoredTasks(days_left, scores, buckets, bands)
+
+
+def stored_priority(deadline, hours: float, today: date) -> Tuple[float, str]:
+    """(PRIORITY_SCORE, PRIORITY_LABEL) as SP_UPDATE_TASK_PRIORITIES stores them"""
+    bucket = bisect.bisect_left(BUCKET_LIMITS, (_to_date(deadline) - today).days)
+    return BUCKET_BASES[bucket] + BUCKET_SIGNS[bucket] * hours, BUCKET_LABELS[bucket]
+
+
+def _to_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
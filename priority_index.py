@@ -0,0 +1,210 @@
+"""Incrementally maintained priority ordering of the board
+
+A task's score only changes when it is edited or when the calendar moves it into
+another deadline bucket (0/3/7/30 days left). ``PriorityIndex`` keeps tasks in
+priority order, applies single-task changes in O(log n) and keeps a heap of the
+next day each task changes bucket, so ``advance()`` only re-scores tasks whose
+boundary has passed.
+"""
+import bisect
+import heapq
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import priority
+from task_store import TaskRecord
+
+# (-score, sequence, task_id): ascending order is descending priority, ties keep insertion order
+RankKey = Tuple[float, int, str]
+
+
+class PriorityIndex:
+    """Tasks ordered by descending priority score"""
+
+    def __init__(self, tasks: Iterable[TaskRecord] = (), today: Optional[date] = None):
+        self._today = today or date.today()
+        self._ranking = _BlockList()
+        self._keys: Dict[str, RankKey] = {}
+        self._inputs: Dict[str, Tuple[int, float]] = {}  # task id -> (deadline ordinal, estimated hours)
+        self._expiry: List[Tuple[int, str, RankKey]] = []  # heap of (day ordinal bucket changes, id, key)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._build(list(tasks))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._keys
+
+    @property
+    def today(self) -> date:
+        return self._today
+
+    def upsert(self, task: TaskRecord) -> None:
+        """Insert or re-score a single task"""
+        with self._lock:
+            old = self._keys.get(task.id)
+            if old is not None:
+                self._ranking.remove(old)
+            seq = old[1] if old is not None else self._next_seq()
+            self._add(task.id, task.deadline.toordinal(), task.estimated_hours, seq)
+
+    def remove(self, task_id: str) -> None:
+        with self._lock:
+            key = self._keys.pop(task_id, None)
+            if key is not None:
+                self._ranking.remove(key)
+                del self._inputs[task_id]
+
+    def advance(self, today: date) -> int:
+        """Move the reference date to ``today``; returns how many tasks changed bucket and were re-scored"""
+        with self._lock:
+            if today == self._today:
+                return 0
+            self._today = today
+            rescored = 0
+            while self._expiry and self._expiry[0][0] <= today.toordinal():
+                _, task_id, key = heapq.heappop(self._expiry)
+                if self._keys.get(task_id) != key:
+                    continue  # stale entry: the task was edited or removed since
+                self._ranking.remove(key)
+                self._add(task_id, *self._inputs[task_id], key[1])
+                rescored += 1
+            return rescored
+
+    def top(self, limit: int, offset: int = 0) -> List[str]:
+        """Task ids ranked ``offset`` .. ``offset + limit`` by priority"""
+        with self._lock:
+            return [key[2] for key in self._ranking.slice(offset, offset + limit)]
+
+    def rank(self, task_ids: Iterable[str], limit: int, offset: int = 0) -> List[str]:
+        """The ``offset`` .. ``offset + limit`` highest-priority ids out of ``task_ids``"""
+        with self._lock:
+            keys = self._keys
+            wanted = offset + limit
+            if isinstance(task_ids, (set, frozenset)) and task_ids and wanted * len(keys) < len(task_ids) ** 2:
+                # Dense selection: walking the ranking reaches the page sooner than heap-selecting every id
+                page = []
+                for key in self._ranking:
+                    if key[2] in task_ids:
+                        page.append(key[2])
+                        if len(page) >= wanted:
+                            break
+                return page[offset:]
+            best = heapq.nsmallest(wanted, (keys[task_id] for task_id in task_ids if task_id in keys))
+        return [key[2] for key in best[offset:]]
+
+    def priority(self, task_id: str) -> priority.Priority:
+        """Score, label, icon and color of one task, with days left as of the index date"""
+        key = self._keys[task_id]
+        score = -key[0]
+        days_left = self._inputs[task_id][0] - self._today.toordinal()
+        bucket = bisect.bisect_left(priority.BUCKET_LIMITS, days_left)
+        band = bisect.bisect_right(priority.SCORE_LIMITS, score)
+        if float(score).is_integer():
+            score = int(score)
+        return priority.Priority(score, days_left, priority.BUCKET_LABELS[bucket],
+                                 priority.SCORE_ICONS[band], priority.SCORE_COLORS[band])
+
+    def _build(self, tasks: List[TaskRecord]) -> None:
+        scored = priority.score_tasks(tasks, self._today)
+        keys = []
+        for position, task in enumerate(tasks):
+            key = (-scored.scores[position].item(), position, task.id)
+            keys.append(key)
+            self._keys[task.id] = key
+            self._inputs[task.id] = (task.deadline.toordinal(), task.estimated_hours)
+            change_day = _bucket_change_day(self._inputs[task.id][0], int(scored.buckets[position]))
+            if change_day is not None:
+                self._expiry.append((change_day, task.id, key))
+        heapq.heapify(self._expiry)
+        self._ranking.extend_sorted(sorted(keys))
+        self._seq = len(tasks)
+
+    def _add(self, task_id: str, deadline: int, hours: float, seq: int) -> None:
+        days_left = deadline - self._today.toordinal()
+        bucket = bisect.bisect_left(priority.BUCKET_LIMITS, days_left)
+        score = priority.BUCKET_BASES[bucket] + priority.BUCKET_SIGNS[bucket] * hours
+        key = (-float(score), seq, task_id)
+        self._keys[task_id] = key
+        self._inputs[task_id] = (deadline, hours)
+        self._ranking.add(key)
+        change_day = _bucket_change_day(deadline, bucket)
+        if change_day is not None:
+            heapq.heappush(self._expiry, (change_day, task_id, key))
+            if len(self._expiry) > 2 * len(self._keys) + 64:
+                self._compact_expiry()
+
+    def _compact_expiry(self) -> None:
+        """Drop heap entries left behind by edits and deletes"""
+        self._expiry = [entry for entry in self._expiry if self._keys.get(entry[1]) == entry[2]]
+        heapq.heapify(self._expiry)
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+
+def _bucket_change_day(deadline: int, bucket: int) -> Optional[int]:
+    """Day ordinal on which a task in ``bucket`` moves to the next, more urgent bucket"""
+    if bucket == 0:
+        return None  # overdue is terminal
+    return deadline - priority.BUCKET_LIMITS[bucket - 1]
+
+
+class _BlockList:
+    """Sorted list kept as small sorted blocks, so inserts and removes touch one block"""
+
+    LOAD = 512
+
+    def __init__(self):
+        self._blocks: List[list] = []
+        self._maxes: list = []
+
+    def extend_sorted(self, keys: list) -> None:
+        """Bulk-load an already sorted list into an empty instance"""
+        self._blocks = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [block[-1] for block in self._blocks]
+
+    def add(self, key) -> None:
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            return
+        i = min(bisect.bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[i]
+        bisect.insort(block, key)
+        self._maxes[i] = block[-1]
+        if len(block) > 2 * self.LOAD:
+            self._blocks[i:i + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self._maxes[i:i + 1] = [block[self.LOAD - 1], block[-1]]
+
+    def remove(self, key) -> None:
+        i = bisect.bisect_left(self._maxes, key)
+        block = self._blocks[i]
+        del block[bisect.bisect_left(block, key)]
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    def slice(self, start: int, stop: int) -> list:
+        result: list = []
+        for block in self._blocks:
+            if start >= len(block):
+                start -= len(block)
+                stop -= len(block)
+                continue
+            result.extend(block[start:stop])
+            stop -= len(block)
+            start = 0
+            if stop <= 0:
+                break
+        return result
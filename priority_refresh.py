@@ -0,0 +1,60 @@
+"""Scheduled PRIORITY_SCORE / PRIORITY_LABEL refresh
+
+On Snowflake the TSK_UPDATE_TASK_PRIORITIES task calls SP_UPDATE_TASK_PRIORITIES
+every night. ``PriorityRefresher`` is the local stand-in for the memory and
+SQLite backends: a daemon thread that runs ``Backend.refresh_priorities`` once at
+start-up and then daily at ``run_at``. Both paths only rewrite rows whose bucket
+(or effort) changed. Run this module to refresh once by hand.
+"""
+import threading
+from datetime import datetime, time, timedelta
+from typing import Optional
+
+import persistence
+from persistence import Backend
+
+
+def next_run(now: datetime, run_at: time) -> datetime:
+    """First ``run_at`` strictly after ``now``"""
+    candidate = datetime.combine(now.date(), run_at)
+    return candidate if candidate > now else candidate + timedelta(days=1)
+
+
+class PriorityRefresher:
+    """Runs the incremental priority refresh on a daily schedule"""
+
+    def __init__(self, backend: Backend, run_at: time = time(0, 5)):
+        self.backend = backend
+        self.run_at = run_at
+        self.last_run: Optional[datetime] = None
+        self.last_updated = 0
+        self.last_error: Optional[Exception] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='priority-refresh', daemon=True)
+
+    def start(self) -> 'PriorityRefresher':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> int:
+        """Refresh now; returns the number of rows updated"""
+        try:
+            self.last_updated = self.backend.refresh_priorities()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+            self.last_updated = 0
+        self.last_run = datetime.now()
+        return self.last_updated
+
+    def _run(self) -> None:
+        self.run_once()
+        while not self._stop.wait((next_run(datetime.now(), self.run_at) - datetime.now()).total_seconds()):
+            self.run_once()
+
+
+if __name__ == '__main__':
+    print(f"{persistence.create_backend().refresh_priorities()} task priorities updated")
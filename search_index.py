@@ -0,0 +1,314 @@
+"""Full-text and faceted search over the board
+
+``SearchIndex`` gives every task a dense integer slot and keeps an inverted index
+from lowercase word tokens to slots (one set for titles, one for descriptions)
+and to account ids (account name and tech stack), plus numpy columns holding each
+slot's account and status. It is patched on every task and account write, like
+the other board indexes.
+
+A query matches tasks that contain every word, the last word also matching as a
+prefix while the user is still typing. Matches are ranked by how strongly they
+match (title over account over description) with ties broken by priority score.
+Filters and facet counts are vectorized masks and bincounts over the columns, so
+no task is visited one by one. Each facet is counted with every other filter
+applied but not its own, so selecting one value still shows the counts of the
+alternatives.
+"""
+import bisect
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+import instrumentation
+import vocabulary
+from priority_index import PriorityIndex
+from task_store import AccountRecord, AccountStore, TaskRecord, TaskStore
+
+FACETS = ('account', 'stage', 'phase', 'status', 'tech')
+ACCOUNT_FACETS = ('account', 'stage', 'phase', 'tech')
+
+TITLE_WEIGHT = 3
+ACCOUNT_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+MIN_PREFIX = 2  # shorter trailing words only match whole tokens
+MAX_EXPANSIONS = 64  # vocabulary terms a trailing prefix may expand to
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+class SearchResult(NamedTuple):
+    ids: List[str]  # the requested page of task ids, best match first
+    total: int
+    facets: Dict[str, Dict[str, int]]  # facet -> value -> matching tasks
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def query_key(query: str, filters: Optional[Dict[str, Iterable[str]]]) -> Tuple:
+    """Hashable, order-insensitive form of a search, for caching"""
+    filters = filters or {}
+    return (' '.join(tokenize(query)) + (' ' if query[-1:].isspace() else ''),
+            tuple((facet, tuple(sorted(filters[facet]))) for facet in FACETS if filters.get(facet)))
+
+
+class SearchIndex:
+    """Inverted index over tasks and accounts, with vectorized filters and facet counts"""
+
+    def __init__(self, accounts: AccountStore, tasks: TaskStore):
+        self._accounts = accounts
+        self._slots: Dict[str, int] = {}  # task id -> slot
+        self._ids: List[Optional[str]] = []  # slot -> task id
+        self._free: List[int] = []
+        self._account_codes: Dict[str, int] = {}
+        self._account_ids: List[str] = []  # code -> account id
+        self._status_codes: Dict[str, int] = {status: code for code, status in enumerate(vocabulary.STATUSES)}
+        self._statuses: List[str] = list(vocabulary.STATUSES)
+        self._alive = np.zeros(0, dtype=bool)
+        self._account_column = np.zeros(0, dtype=np.int32)
+        self._status_column = np.zeros(0, dtype=np.int16)
+        # term -> (slots with it in the title, slots with it only in the description)
+        self._postings: Dict[str, Tuple[Set[int], Set[int]]] = {}
+        self._task_terms: Dict[str, Tuple[Tuple[str, int], ...]] = {}  # task id -> (term, 0 title / 1 description)
+        self._vocab: List[str] = []  # sorted keys of _postings
+        self._account_postings: Dict[str, Set[str]] = {}  # term -> account ids
+        self._account_terms: Dict[str, Tuple[str, ...]] = {}
+        self._account_vocab: List[str] = []
+        self._lock = threading.Lock()
+        for account in accounts:
+            self.put_account(account)
+        self._grow(len(tasks))
+        for task in tasks:
+            self.put_task(task)
+
+    def put_task(self, task: TaskRecord) -> None:
+        fields: Dict[str, int] = {}
+        for term in tokenize(task.description):
+            fields[term] = 1
+        for term in tokenize(task.title):
+            fields[term] = 0
+        with self._lock:
+            slot = self._slots.get(task.id)
+            if slot is None:
+                slot = self._allocate(task.id)
+            else:
+                self._unindex_terms(task.id, slot)
+            for term, field in fields.items():
+                if term not in self._postings:
+                    self._postings[term] = (set(), set())
+                    bisect.insort(self._vocab, term)
+                self._postings[term][field].add(slot)
+            self._task_terms[task.id] = tuple(fields.items())
+            self._account_column[slot] = self._account_code(task.account_id)
+            self._status_column[slot] = self._status_code(task.status)
+
+    def drop_task(self, task_id: str) -> None:
+        with self._lock:
+            slot = self._slots.pop(task_id, None)
+            if slot is None:
+                return
+            self._unindex_terms(task_id, slot)
+            self._alive[slot] = False
+            self._ids[slot] = None
+            self._free.append(slot)
+
+    def put_account(self, account: AccountRecord) -> None:
+        terms = set(tokenize(account.name))
+        for tech in account.tech_stack:
+            terms.update(tokenize(tech))
+        with self._lock:
+            self._account_code(account.id)
+            for term in self._account_terms.pop(account.id, ()):
+                _discard(self._account_postings, self._account_vocab, term, account.id)
+            for term in terms:
+                if term not in self._account_postings:
+                    self._account_postings[term] = set()
+                    bisect.insort(self._account_vocab, term)
+                self._account_postings[term].add(account.id)
+            self._account_terms[account.id] = tuple(terms)
+
+    def search(self, query: str, filters: Optional[Dict[str, Iterable[str]]], priorities: PriorityIndex,
+               limit: int, offset: int = 0) -> SearchResult:
+        """One page of matching task ids, the total and the facet counts"""
+        filters = {facet: set(values) for facet, values in (filters or {}).items() if values}
+        with self._lock:
+            instrumentation.count('rows.scanned', len(self._ids))
+            scores = self._score(query)
+            matched = self._alive if scores is None else scores > 0
+            account_masks = {facet: self._account_mask(self._accounts_for(facet, filters[facet]))
+                             for facet in ACCOUNT_FACETS if facet in filters}
+            status_mask = self._status_mask(filters['status']) if 'status' in filters else None
+            facets = self._facets(matched, account_masks, status_mask)
+            slots = np.flatnonzero(_all([matched, status_mask, *account_masks.values()]))
+            if scores is not None:
+                return SearchResult(self._rank(slots, scores, priorities, limit, offset), len(slots), facets)
+            if len(slots) == len(priorities):
+                return SearchResult(priorities.top(limit, offset), len(slots), facets)
+            return SearchResult(priorities.rank(self._task_ids(slots), limit, offset), len(slots), facets)
+
+    def _score(self, query: str) -> Optional[np.ndarray]:
+        """Per-slot text score, 0 where a query word is missing; None for an empty query"""
+        terms = tokenize(query)
+        if not terms:
+            return None
+        typing = not query[-1:].isspace()
+        total = np.zeros(len(self._alive), dtype=np.int16)
+        missing = ~self._alive
+        for position, term in enumerate(terms):
+            prefix = typing and position == len(terms) - 1 and len(term) >= MIN_PREFIX
+            postings = [self._postings[expansion] for expansion in _expand(self._vocab, self._postings, term, prefix)]
+            account_ids = set().union(*(self._account_postings[expansion] for expansion in
+                                        _expand(self._account_vocab, self._account_postings, term, prefix)))
+            # Each word counts once per task, at its strongest match
+            weight = np.zeros(len(self._alive), dtype=np.int16)
+            weight[_array(set().union(*(descriptions for _, descriptions in postings)))] = DESCRIPTION_WEIGHT
+            if account_ids:
+                weight[self._account_mask(account_ids)] = ACCOUNT_WEIGHT
+            weight[_array(set().union(*(titles for titles, _ in postings)))] = TITLE_WEIGHT
+            total += weight
+            missing |= weight == 0
+        total[missing] = 0
+        return total
+
+    def _rank(self, slots: np.ndarray, scores: np.ndarray, priorities: PriorityIndex,
+              limit: int, offset: int) -> List[str]:
+        """Best text score first; equal scores in priority order"""
+        slot_scores = scores[slots]
+        page, skip = [], offset
+        for score in np.unique(slot_scores)[::-1]:
+            group = slots[slot_scores == score]
+            if skip >= len(group):
+                skip -= len(group)
+                continue
+            page.extend(priorities.rank(self._task_ids(group), limit - len(page), skip))
+            skip = 0
+            if len(page) >= limit:
+                break
+        return page
+
+    def _facets(self, matched: np.ndarray, account_masks: Dict[str, np.ndarray],
+                status_mask: Optional[np.ndarray]) -> Dict[str, Dict[str, int]]:
+        facets: Dict[str, Dict[str, int]] = {facet: defaultdict(int) for facet in FACETS}
+        # Tasks per account under the query and status filter, then rolled up through the account attributes
+        in_scope = _all([matched, status_mask])
+        per_account = self._per_account(in_scope)
+        for facet in ACCOUNT_FACETS:
+            others = [mask for other, mask in account_masks.items() if other != facet]
+            counts = self._per_account(_all([in_scope, *others])) if others else per_account
+            for code in np.flatnonzero(counts):
+                account = self._accounts.get(self._account_ids[code])
+                if account is None:
+                    continue
+                count = int(counts[code])
+                if facet == 'account':
+                    facets[facet][account.id] += count
+                elif facet == 'tech':
+                    for tech in account.tech_stack:
+                        facets[facet][tech] += count
+                else:
+                    facets[facet][getattr(account, facet)] += count
+        by_status = np.bincount(self._status_column[_all([matched, *account_masks.values()])],
+                                minlength=len(self._statuses))
+        facets['status'] = {status: int(by_status[code]) for code, status in enumerate(self._statuses)}
+        return {facet: dict(counts) for facet, counts in facets.items()}
+
+    def _per_account(self, mask: np.ndarray) -> np.ndarray:
+        return np.bincount(self._account_column[mask], minlength=len(self._account_ids))
+
+    def _accounts_for(self, facet: str, values: Set[str]) -> Set[str]:
+        if facet == 'account':
+            return values
+        if facet == 'tech':
+            return {account.id for account in self._accounts if not values.isdisjoint(account.tech_stack)}
+        return {account.id for account in self._accounts if getattr(account, facet) in values}
+
+    def _account_mask(self, account_ids: Set[str]) -> np.ndarray:
+        codes = [self._account_codes[account_id] for account_id in account_ids if account_id in self._account_codes]
+        return np.isin(self._account_column, codes) & self._alive
+
+    def _status_mask(self, statuses: Set[str]) -> np.ndarray:
+        codes = [self._status_codes[status] for status in statuses if status in self._status_codes]
+        return np.isin(self._status_column, codes) & self._alive
+
+    def _task_ids(self, slots: np.ndarray) -> Set[str]:
+        ids = self._ids
+        return {ids[slot] for slot in slots.tolist()}
+
+    def _account_code(self, account_id: str) -> int:
+        code = self._account_codes.get(account_id)
+        if code is None:
+            code = self._account_codes[account_id] = len(self._account_ids)
+            self._account_ids.append(account_id)
+        return code
+
+    def _status_code(self, status: str) -> int:
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self._statuses)
+            self._statuses.append(status)
+        return code
+
+    def _allocate(self, task_id: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = task_id
+        else:
+            slot = len(self._ids)
+            self._ids.append(task_id)
+            if slot >= len(self._alive):
+                self._grow(max(2 * len(self._alive), 1024))
+        self._slots[task_id] = slot
+        self._alive[slot] = True
+        return slot
+
+    def _grow(self, capacity: int) -> None:
+        extra = capacity - len(self._alive)
+        if extra > 0:
+            self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+            self._account_column = np.concatenate([self._account_column, np.zeros(extra, dtype=np.int32)])
+            self._status_column = np.concatenate([self._status_column, np.zeros(extra, dtype=np.int16)])
+
+    def _unindex_terms(self, task_id: str, slot: int) -> None:
+        for term, field in self._task_terms.pop(task_id, ()):
+            titles, descriptions = self._postings[term]
+            (titles, descriptions)[field].discard(slot)
+            if not titles and not descriptions:
+                del self._postings[term]
+                del self._vocab[bisect.bisect_left(self._vocab, term)]
+
+
+def _expand(vocab: List[str], postings: Dict, term: str, prefix: bool) -> List[str]:
+    """Vocabulary terms a query word matches: itself, or everything it prefixes"""
+    if not prefix:
+        return [term] if term in postings else []
+    start = bisect.bisect_left(vocab, term)
+    stop = bisect.bisect_left(vocab, term + '￿', start, min(len(vocab), start + MAX_EXPANSIONS))
+    return vocab[start:stop]
+
+
+def _array(slots: Set[int]) -> np.ndarray:
+    return np.fromiter(slots, dtype=np.intp, count=len(slots))
+
+
+def _all(masks: Iterable[Optional[np.ndarray]]) -> Optional[np.ndarray]:
+    """Element-wise AND of the given masks, None (no constraint) when all are None"""
+    result = None
+    for mask in masks:
+        if mask is not None:
+            result = mask if result is None else result & mask
+    return result
+
+
+def _discard(postings: Dict[str, Set[str]], vocab: List[str], term: str, record_id: str) -> None:
+    ids = postings.get(term)
+    if ids is None:
+        return
+    ids.discard(record_id)
+    if not ids:
+        del postings[term]
+        del vocab[bisect.bisect_left(vocab, term)]
@@ -28,7 +28,8 @@ CREATE OR REPLACE TABLE TBL_ACCOUNTS (
     UPDATED_AT TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
     CREATED_BY VARCHAR(100) DEFAULT CURRENT_USER(),
     UPDATED_BY VARCHAR(100) DEFAULT CURRENT_USER(),
-    IS_ACTIVE BOOLEAN DEFAULT TRUE
+    IS_ACTIVE BOOLEAN DEFAULT TRUE,
+    ROW_VERSION NUMBER NOT NULL DEFAULT 1  -- compare-and-swap version, +1 on every app update
 )
 COMMENT = 'Master table for managing client accounts with their stages, phases, and technology stacks';
 
@@ -52,6 +53,7 @@ CREATE OR REPLACE TABLE TBL_TASKS (
     CREATED_BY VARCHAR(100) DEFAULT CURRENT_USER(),
     UPDATED_BY VARCHAR(100) DEFAULT CURRENT_USER(),
     IS_ACTIVE BOOLEAN DEFAULT TRUE,
+    ROW_VERSION NUMBER NOT NULL DEFAULT 1,  -- compare-and-swap version, +1 on every app update
     
     -- Foreign key constraint
     CONSTRAINT FK_TASKS_ACCOUNT FOREIGN KEY (ACCOUNT_ID) REFERENCES TBL_ACCOUNTS(ACCOUNT_ID)
@@ -64,7 +66,7 @@ COMMENT = 'Main table for managing tasks associated with accounts, including pri
 CREATE OR REPLACE TABLE TBL_TASK_HISTORY (
     HISTORY_ID VARCHAR(50) PRIMARY KEY DEFAULT UUID_STRING(),
     TASK_ID VARCHAR(50) NOT NULL,
-    CHANGE_TYPE VARCHAR(20) NOT NULL, -- INSERT, UPDATE, DELETE
+    CHANGE_TYPE VARCHAR(20) NOT NULL, -- INSERT, UPDATE, DELETE, BULK_UPDATE (one entry per batch)
     OLD_VALUES VARIANT,
     NEW_VALUES VARIANT,
     CHANGED_BY VARCHAR(100) DEFAULT CURRENT_USER(),
@@ -74,6 +76,15 @@ CREATE OR REPLACE TABLE TBL_TASK_HISTORY (
 )
 COMMENT = 'Audit trail table to track all changes made to tasks';
 
+-- =====================================================
+-- APP METADATA TABLE
+-- =====================================================
+CREATE OR REPLACE TABLE TBL_APP_METADATA (
+    META_KEY VARCHAR(50) PRIMARY KEY,
+    META_VALUE VARCHAR(500) NOT NULL
+)
+COMMENT = 'Facts about this copy of the tables; DATABASE_ID changes whenever they are recreated';
+
 -- =====================================================
 -- LOOKUP TABLES
 -- =====================================================
@@ -112,6 +123,9 @@ COMMENT = 'Lookup table for available technology stack options';
 -- INSERT REFERENCE DATA
 -- =====================================================
 
+-- Identity of this copy of the tables; the app only reuses on-disk board snapshots taken from it
+INSERT INTO TBL_APP_METADATA (META_KEY, META_VALUE) SELECT 'DATABASE_ID', UUID_STRING();
+
 -- Insert Account Stages
 INSERT INTO LKP_ACCOUNT_STAGES (STAGE_CODE, STAGE_NAME, STAGE_DESCRIPTION, SORT_ORDER) VALUES
 ('LEAD', 'Lead', 'Initial contact or inquiry from potential client', 1),
@@ -185,6 +199,7 @@ SELECT
     t.COMPLETION_DATE,
     t.CREATED_AT,
     t.UPDATED_AT,
+    t.ROW_VERSION,
     DATEDIFF('day', CURRENT_DATE(), t.DEADLINE_DATE) AS DAYS_UNTIL_DEADLINE,
     CASE 
         WHEN t.DEADLINE_DATE < CURRENT_DATE() THEN 'OVERDUE'
@@ -218,36 +233,64 @@ WHERE a.IS_ACTIVE = TRUE;
 -- STORED PROCEDURES
 -- =====================================================
 
--- Procedure to calculate and update task priorities
+-- Procedure to calculate and update task priorities.
+-- Incremental: only rows whose computed score or label differs from the stored
+-- one are rewritten (new rows, edited effort, or a deadline bucket crossed since
+-- the last run), so unchanged rows keep their micro-partitions and UPDATED_AT.
+-- Returns the number of rows updated.
 CREATE OR REPLACE PROCEDURE SP_UPDATE_TASK_PRIORITIES()
-RETURNS STRING
+RETURNS NUMBER
 LANGUAGE SQL
 AS
 $$
 BEGIN
-    UPDATE TBL_TASKS 
+    UPDATE TBL_TASKS t
     SET 
-        PRIORITY_SCORE = CASE 
-            WHEN DEADLINE_DATE < CURRENT_DATE() THEN 1000 + ESTIMATED_HOURS
-            WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 3 THEN 900 - ESTIMATED_HOURS
-            WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 7 THEN 800 - ESTIMATED_HOURS
-            WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 30 THEN 600 - ESTIMATED_HOURS
-            ELSE 400 - ESTIMATED_HOURS
-        END,
-        PRIORITY_LABEL = CASE 
-            WHEN DEADLINE_DATE < CURRENT_DATE() THEN 'CRITICAL'
-            WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 3 THEN 'URGENT'
-            WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 7 THEN 'HIGH'
-            WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 30 THEN 'MEDIUM'
-            ELSE 'LOW'
-        END,
+        PRIORITY_SCORE = p.SCORE,
+        PRIORITY_LABEL = p.LABEL,
         UPDATED_AT = CURRENT_TIMESTAMP()
-    WHERE IS_ACTIVE = TRUE;
+    FROM (
+        SELECT 
+            TASK_ID,
+            CASE 
+                WHEN DEADLINE_DATE < CURRENT_DATE() THEN 1000 + ESTIMATED_HOURS
+                WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 3 THEN 900 - ESTIMATED_HOURS
+                WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 7 THEN 800 - ESTIMATED_HOURS
+                WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 30 THEN 600 - ESTIMATED_HOURS
+                ELSE 400 - ESTIMATED_HOURS
+            END AS SCORE,
+            CASE 
+                WHEN DEADLINE_DATE < CURRENT_DATE() THEN 'CRITICAL'
+                WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 3 THEN 'URGENT'
+                WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 7 THEN 'HIGH'
+                WHEN DATEDIFF('day', CURRENT_DATE(), DEADLINE_DATE) <= 30 THEN 'MEDIUM'
+                ELSE 'LOW'
+            END AS LABEL
+        FROM TBL_TASKS
+        WHERE IS_ACTIVE = TRUE
+    ) p
+    WHERE t.TASK_ID = p.TASK_ID
+      AND (t.PRIORITY_SCORE IS DISTINCT FROM p.SCORE OR t.PRIORITY_LABEL IS DISTINCT FROM p.LABEL);
     
-    RETURN 'Task priorities updated successfully';
+    RETURN SQLROWCOUNT;
 END;
 $$;
 
+-- =====================================================
+-- SCHEDULED TASKS
+-- =====================================================
+
+-- Buckets only move when the date changes, so refresh once a day just after midnight
+CREATE OR REPLACE TASK TSK_UPDATE_TASK_PRIORITIES
+    USER_TASK_MANAGED_INITIAL_WAREHOUSE_SIZE = 'XSMALL'
+    SCHEDULE = 'USING CRON 5 0 * * * UTC'
+    TIMEZONE = 'UTC'
+    COMMENT = 'Nightly incremental refresh of PRIORITY_SCORE / PRIORITY_LABEL'
+AS
+    CALL SP_UPDATE_TASK_PRIORITIES();
+
+ALTER TASK TSK_UPDATE_TASK_PRIORITIES RESUME;
+
 -- =====================================================
 -- GRANTS (adjust as needed for your security model)
 -- =====================================================
@@ -263,6 +306,7 @@ GRANT USAGE ON ALL SEQUENCES IN SCHEMA TASK_MANAGEMENT TO ROLE SYSADMIN;
 
 -- Grant execute on stored procedures
 GRANT USAGE ON PROCEDURE SP_UPDATE_TASK_PRIORITIES() TO ROLE SYSADMIN;
+GRANT OPERATE, MONITOR ON TASK TSK_UPDATE_TASK_PRIORITIES TO ROLE SYSADMIN;
 
 -- =====================================================
 -- INITIAL SETUP COMPLETE
@@ -0,0 +1,263 @@
+"""Indexed in-memory stores for accounts and tasks
+
+Records are compact ``__slots__`` objects and are treated as immutable: an update
+replaces the record, so a session holding an old reference never sees it change
+underneath it. Every record carries a ``version`` used for compare-and-swap
+updates; ``merge_fields`` merges an edit made against an older version.
+``TaskStore`` keeps secondary indexes by account, status and deadline date current
+on every insert, update and delete.
+"""
+import bisect
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Deadline buckets as inclusive ranges of days until the deadline (SP_UPDATE_TASK_PRIORITIES)
+DEADLINE_BUCKETS = {
+    'overdue': (None, -1),
+    'urgent': (0, 3),
+    'high': (4, 7),
+    'medium': (8, 30),
+    'low': (31, None),
+}
+
+# Smallest estimate the task forms accept (they step in half hours); importers apply the same rule
+MIN_HOURS = 0.5
+
+
+def whole_hours(value) -> float:
+    """Hours as a float, or an int when whole, like the forms show them (also for Decimal from SQL)"""
+    value = round(float(value), 2)
+    return int(value) if value.is_integer() else value
+
+
+class EditConflict(Exception):
+    """A compare-and-swap update lost against a concurrent change"""
+
+    def __init__(self, record_id: str, current=None, fields: Iterable[str] = ()):
+        self.record_id = record_id
+        self.current = current  # latest record, or None when it was deleted or changed by another process
+        self.fields = list(fields)  # fields both edits changed to different values
+        super().__init__(f"'{record_id}' was changed concurrently" +
+                         (f" ({', '.join(self.fields)})" if self.fields else ''))
+
+
+def merge_fields(base: Dict, mine: Dict, theirs: Dict) -> Tuple[Dict, List[str]]:
+    """Three-way merge of one record: (fields this edit changed, fields that conflict with ``theirs``)"""
+    changes, conflicts = {}, []
+    for field, value in mine.items():
+        if field in ('id', 'version') or value == base.get(field):
+            continue
+        if theirs.get(field) not in (base.get(field), value):
+            conflicts.append(field)
+        else:
+            changes[field] = value
+    return changes, conflicts
+
+
+class AccountRecord:
+    """A single account; ``version`` goes up by one on every change"""
+
+    __slots__ = ('id', 'name', 'stage', 'phase', 'tech_stack', 'version')
+
+    def __init__(self, id: str, name: str, stage: str, phase: str, tech_stack: Iterable[str] = (), version: int = 1):
+        self.id = id
+        self.name = name
+        self.stage = stage
+        self.phase = phase
+        self.tech_stack = tuple(tech_stack)
+        self.version = version
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AccountRecord':
+        return cls(data['id'], data['name'], data['stage'], data['phase'], data.get('tech_stack', ()),
+                   data.get('version', 1))
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'stage': self.stage,
+            'phase': self.phase,
+            'tech_stack': list(self.tech_stack),
+            'version': self.version
+        }
+
+    def replace(self, **changes) -> 'AccountRecord':
+        return AccountRecord.from_dict(dict(self.to_dict(), **changes))
+
+
+class TaskRecord:
+    """A single task; ``version`` goes up by one on every content change"""
+
+    __slots__ = ('id', 'account_id', 'title', 'description', 'estimated_hours', 'deadline', 'status', 'created_at',
+                 'version')
+
+    def __init__(self, id: str, account_id: str, title: str, description: str, estimated_hours: float,
+                 deadline: datetime, status: str, created_at: Optional[datetime] = None, version: int = 1):
+        self.id = id
+        self.account_id = account_id
+        self.title = title
+        self.description = description
+        self.estimated_hours = estimated_hours
+        self.deadline = deadline
+        self.status = status
+        self.created_at = created_at or datetime.now()
+        self.version = version
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TaskRecord':
+        return cls(data['id'], data['account_id'], data['title'], data.get('description', ''),
+                   data['estimated_hours'], data['deadline'], data['status'], data.get('created_at'),
+                   data.get('version', 1))
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def replace(self, **changes) -> 'TaskRecord':
+        return TaskRecord.from_dict(dict(self.to_dict(), **changes))
+
+
+class AccountStore:
+    """Accounts by id, in insertion order"""
+
+    def __init__(self, accounts: Iterable[AccountRecord] = ()):
+        self._by_id: Dict[str, AccountRecord] = {}
+        self._position: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        for account in accounts:
+            self.upsert(account)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[AccountRecord]:
+        return iter(list(self._by_id.values()))
+
+    def __contains__(self, account_id: str) -> bool:
+        return account_id in self._by_id
+
+    def get(self, account_id: str) -> Optional[AccountRecord]:
+        return self._by_id.get(account_id)
+
+    def ids(self) -> List[str]:
+        return list(self._by_id)
+
+    def position(self, account_id: str) -> int:
+        """Index of the account in ``ids()``, for selectbox defaults"""
+        return self._position.get(account_id, 0)
+
+    def upsert(self, account: AccountRecord, expected_version: Optional[int] = None) -> None:
+        """Insert or replace an account; with ``expected_version``, only replace that version"""
+        with self._lock:
+            current = self._by_id.get(account.id)
+            if expected_version is not None and (current is None or current.version != expected_version):
+                raise EditConflict(account.id, current)
+            if current is None:
+                self._position[account.id] = len(self._by_id)
+            self._by_id[account.id] = account
+
+
+class TaskStore:
+    """Tasks by id with secondary indexes by account, status and deadline date"""
+
+    def __init__(self, tasks: Iterable[TaskRecord] = ()):
+        self._by_id: Dict[str, TaskRecord] = {}
+        self._by_account: Dict[str, Set[str]] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        self._by_deadline: Dict[date, Set[str]] = {}
+        self._deadlines: List[date] = []  # sorted keys of _by_deadline
+        self._lock = threading.Lock()
+        for task in tasks:
+            self.insert(task)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[TaskRecord]:
+        return iter(list(self._by_id.values()))
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._by_id
+
+    def get(self, task_id: str) -> Optional[TaskRecord]:
+        return self._by_id.get(task_id)
+
+    def insert(self, task: TaskRecord) -> None:
+        with self._lock:
+            if task.id in self._by_id:
+                self._unindex(self._by_id[task.id])
+            self._by_id[task.id] = task
+            self._index(task)
+
+    def update(self, task: TaskRecord, expected_version: Optional[int] = None) -> TaskRecord:
+        """Replace the stored record with the same id, only if it is still at ``expected_version`` when given"""
+        with self._lock:
+            current = self._by_id.get(task.id)
+            if current is None:
+                raise KeyError(task.id)
+            if expected_version is not None and current.version != expected_version:
+                raise EditConflict(task.id, current)
+            self._unindex(current)
+            self._by_id[task.id] = task
+            self._index(task)
+            return current
+
+    def delete(self, task_id: str) -> Optional[TaskRecord]:
+        with self._lock:
+            task = self._by_id.pop(task_id, None)
+            if task is not None:
+                self._unindex(task)
+            return task
+
+    def by_account(self, account_id: str) -> List[TaskRecord]:
+        return self._records(self._by_account.get(account_id, ()))
+
+    def by_status(self, status: str) -> List[TaskRecord]:
+        return self._records(self._by_status.get(status, ()))
+
+    def by_deadline_bucket(self, bucket: str, today: Optional[date] = None) -> List[TaskRecord]:
+        """Tasks whose deadline falls in one of DEADLINE_BUCKETS relative to ``today``"""
+        today = today or date.today()
+        low, high = DEADLINE_BUCKETS[bucket]
+        with self._lock:
+            start = 0 if low is None else bisect.bisect_left(self._deadlines, today + timedelta(days=low))
+            stop = len(self._deadlines) if high is None else bisect.bisect_right(self._deadlines, today + timedelta(days=high))
+            ids = [task_id for day in self._deadlines[start:stop] for task_id in self._by_deadline[day]]
+        return self._records(ids)
+
+    def _records(self, ids: Iterable[str]) -> List[TaskRecord]:
+        by_id = self._by_id
+        return [by_id[task_id] for task_id in list(ids) if task_id in by_id]
+
+    def _index(self, task: TaskRecord) -> None:
+        self._by_account.setdefault(task.account_id, set()).add(task.id)
+        self._by_status.setdefault(task.status, set()).add(task.id)
+        day = _deadline_date(task.deadline)
+        if day not in self._by_deadline:
+            self._by_deadline[day] = set()
+            bisect.insort(self._deadlines, day)
+        self._by_deadline[day].add(task.id)
+
+    def _unindex(self, task: TaskRecord) -> None:
+        _discard(self._by_account, task.account_id, task.id)
+        _discard(self._by_status, task.status, task.id)
+        day = _deadline_date(task.deadline)
+        if _discard(self._by_deadline, day, task.id):
+            del self._deadlines[bisect.bisect_left(self._deadlines, day)]
+
+
+def _deadline_date(deadline: datetime) -> date:
+    return deadline.date() if isinstance(deadline, datetime) else deadline
+
+
+def _discard(index: Dict, key, task_id: str) -> bool:
+    """Remove ``task_id`` from ``index[key]``; returns True when the key became empty and was dropped"""
+    ids = index.get(key)
+    if ids is None:
+        return False
+    ids.discard(task_id)
+    if not ids:
+        del index[key]
+        return True
+    return False
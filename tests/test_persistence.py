@@ -0,0 +1,107 @@
+"""SQLite-backed checks of the compare-and-set updates and the audit spool replay"""
+import json
+
+import pytest
+
+import persistence
+from audit import AuditLog
+from persistence import SQLiteBackend
+
+
+@pytest.fixture
+def backend():
+    return SQLiteBackend(':memory:')
+
+
+def tasks_by_id(backend):
+    return {task['id']: task for task in backend.load_board()[1]}
+
+
+def edited(task, **changes):
+    return dict(task, version=task['version'] + 1, **changes)
+
+
+def test_update_applies_next_version(backend):
+    task = backend.load_board()[1][0]
+    assert backend.update_tasks([edited(task, title='Renamed')]) == []
+    stored = tasks_by_id(backend)[task['id']]
+    assert (stored['title'], stored['version']) == ('Renamed', task['version'] + 1)
+
+
+def test_stale_version_is_reported(backend):
+    task = backend.load_board()[1][0]
+    assert backend.update_tasks([edited(task, title='First')]) == []
+    assert backend.update_tasks([edited(task, status='completed')]) == [task['id']]
+    assert tasks_by_id(backend)[task['id']]['status'] == task['status']
+
+
+def test_same_version_race_reports_only_the_loser(backend):
+    mine, other = backend.load_board()[1][:2]
+    assert backend.update_tasks([edited(mine, title='Theirs')]) == []
+    assert backend.update_tasks([edited(mine, title='Mine'), edited(other, title='Other')]) == [mine['id']]
+    stored = tasks_by_id(backend)
+    assert (stored[mine['id']]['title'], stored[other['id']]['title']) == ('Theirs', 'Other')
+
+
+def test_deleted_row_is_reported(backend):
+    task = backend.load_board()[1][0]
+    backend.delete_task(task['id'])
+    assert backend.update_tasks([edited(task, title='Gone')]) == [task['id']]
+
+
+def test_mixed_chunks(backend, monkeypatch):
+    monkeypatch.setattr(persistence, 'CAS_BATCH_ROWS', 2)
+    tasks = backend.load_board()[1]
+    stale, deleted, fresh = tasks[0], tasks[1], tasks[2:]
+    backend.update_tasks([edited(stale, title='Elsewhere')])
+    backend.delete_task(deleted['id'])
+    batch = [edited(stale, title='Late'), edited(deleted, title='Late')] + [edited(t, title='Bulk') for t in fresh]
+    assert sorted(backend.update_tasks(batch)) == sorted([stale['id'], deleted['id']])
+    stored = tasks_by_id(backend)
+    assert all(stored[t['id']]['title'] == 'Bulk' for t in fresh)
+
+
+def test_account_update_compares_tech_stack(backend):
+    account = backend.load_board()[0][0]
+    assert backend.update_accounts([edited(account, tech_stack=['Python', 'Redis'])]) == []
+    assert backend.update_accounts([edited(account, tech_stack=['React'])]) == [account['id']]
+    assert backend.load_board()[0][0]['tech_stack'] == ['Python', 'Redis']
+
+
+def history_count(backend):
+    return backend._keepalive.execute("SELECT COUNT(*) FROM TBL_TASK_HISTORY").fetchone()[0]
+
+
+@pytest.fixture
+def audit(backend, tmp_path):
+    log = AuditLog(backend, str(tmp_path / 'spool.jsonl'), flush_interval=3600)
+    yield log
+    log.close()
+
+
+def test_replayed_history_batch_is_skipped(backend, audit):
+    task_id = backend.load_board()[1][0]['id']
+    audit.record(task_id, {'title': 'a'}, {'title': 'b'})
+    entries = list(audit._buffer)
+    assert audit.flush() == 1
+    audit.close()
+    # A crash after the insert committed leaves the batch in the .flushing file for the next process
+    with open(audit.spool_path + '.flushing', 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(entry) + '\n' for entry in entries)
+    replay = AuditLog(backend, audit.spool_path, flush_interval=3600)
+    assert replay.pending() == 1
+    assert replay.flush() == 1
+    replay.close()
+    assert (history_count(backend), replay.last_error) == (1, None)
+
+
+def test_rejected_history_entry_is_set_aside(backend, audit, tmp_path):
+    task_id = backend.load_board()[1][0]['id']
+    audit.record('no-such-task', None, {'title': 'orphan'})
+    audit.record(task_id, {'title': 'a'}, {'title': 'b'})
+    assert audit.flush() == 1
+    assert (audit.rejected, audit.pending(), history_count(backend)) == (1, 0, 1)
+    with open(str(tmp_path / 'spool.jsonl.rejected'), encoding='utf-8') as f:
+        rejected = [json.loads(line) for line in f]
+    assert [entry['task_id'] for entry in rejected] == ['no-such-task']
+    assert rejected[0]['error'].startswith('IntegrityError')
@@ -0,0 +1,47 @@
+"""Option vocabularies shared by the UI, the persistence layer and the importers"""
+import re
+from typing import Dict, List
+
+STAGES = ["Lead", "Prospect", "Customer", "Partner"]
+PHASES = ["Discovery", "Qualification", "Journey", "Implementation", "Support"]
+STATUSES = ["pending", "in_progress", "completed", "on_hold"]
+TECH_STACK = ["Python", "Streamlit", "React", "Node.js", "Redis", "Docker", "PostgreSQL", "MongoDB", "AWS", "Azure"]
+
+# Positions for selectbox defaults, instead of list.index() on every render
+STAGE_INDEX = {stage: i for i, stage in enumerate(STAGES)}
+PHASE_INDEX = {phase: i for i, phase in enumerate(PHASES)}
+STATUS_INDEX = {status: i for i, status in enumerate(STATUSES)}
+
+# Lists that the LKP_* tables can replace at start-up (statuses have no lookup table)
+OPTION_LISTS = {'stages': STAGES, 'phases': PHASES, 'tech_stack': TECH_STACK}
+
+
+def to_code(name: str) -> str:
+    """Convert a display value to its LKP_* code (e.g. 'Node.js' -> 'NODEJS', 'in_progress' -> 'IN_PROGRESS')"""
+    return re.sub(r'[^A-Z0-9_]', '', name.upper())
+
+
+def from_code(code: str, options: List[str]) -> str:
+    """Convert an LKP_* code back to the matching display value, or return it unchanged"""
+    for option in options:
+        if to_code(option) == code:
+            return option
+    return code
+
+
+def option_name(code: str, name: str, options: List[str]) -> str:
+    """Display value for an LKP_* row: the built-in spelling if its code is known (e.g. 'AWS'), else its name"""
+    for option in options:
+        if to_code(option) == code:
+            return option
+    return name
+
+
+def use_options(options: Dict[str, List[str]]) -> None:
+    """Replace option lists in place, so modules holding references see them, and rebuild the indexes"""
+    for key, values in options.items():
+        if values and key in OPTION_LISTS:
+            OPTION_LISTS[key][:] = values
+    for index, values in ((STAGE_INDEX, STAGES), (PHASE_INDEX, PHASES)):
+        index.clear()
+        index.update((value, i) for i, value in enumerate(values))